@@ -1,28 +1,63 @@
 import logging
 
+from a2wsgi import WSGIMiddleware
 from flask import Flask
-from flask_compress import Compress
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 
+from app.admission import Admission
+from app.cache import Cache
+from app.compression import Compression
+from app.events import Events
+from app.hashing import Hasher
+from app.instrumentation import Instrumentation
+from app.pool import DatabasePool
+from app.ratelimit import after_fork as ratelimit_after_fork
+from app.ratelimit import rate_limit_key, rate_limit_tier
+from app.replicas import Replicas, RoutingSession
+from app.serialisation import Serialiser
 from config import Config
 
-compress = Compress()
-db = SQLAlchemy()
-limiter = Limiter(key_func=get_remote_address, default_limits=["1 per second"])
+admission = Admission()
+compression = Compression()
+database_pool = DatabasePool()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+hasher = Hasher()
+idempotency_cache = Cache("idempotency")
+instrumentation = Instrumentation()
+list_cache = Cache("list", tiered=True)
+limiter = Limiter(key_func=rate_limit_key, default_limits=[rate_limit_tier])
 migrate = Migrate()
+replicas = Replicas()
+serialiser = Serialiser()
+events = Events(serialiser)
+token_cache = Cache("token")
 
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
-    compress.init_app(app)
+    admission.init_app(app)
+    compression.init_app(app)
+    database_pool.init_app(app)
+    replicas.init_app(app)
     db.init_app(app)
+    events.init_app(app)
+    hasher.init_app(app)
+    idempotency_cache.init_app(app)
+    instrumentation.init_app(app)
+    if app.config["RATELIMIT_STORAGE_URI"].startswith("hybrid+"):
+        app.config["RATELIMIT_STORAGE_OPTIONS"] = {
+            "sync_interval": app.config["RATELIMIT_SYNC_INTERVAL"],
+            "sync_batch": app.config["RATELIMIT_SYNC_BATCH"],
+        }
     limiter.init_app(app)
+    list_cache.init_app(app)
     migrate.init_app(app, db)
+    serialiser.init_app(app)
+    token_cache.init_app(app)
 
     # Register blueprints
     from app.auth import bp as auth_bp
@@ -44,4 +79,32 @@ def create_app(config_class=Config):
     return app
 
 
+def after_fork(app):
+    """Recreate the per process state of an app created before the process forked.
+
+    Called in each worker when gunicorn preloads the app in its master process (see
+    gunicorn.conf.py), so workers share the loaded code, OpenAPI document and schema
+    validators copy-on-write, but not pooled database or Redis connections, threads
+    or locks. The master's connections are left open for the master to close.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    for extension in (events, hasher, idempotency_cache, list_cache, token_cache):
+        extension.after_fork()
+    if limiter.enabled:
+        ratelimit_after_fork(limiter.storage)
+
+
+def create_asgi_app(config_class=Config):
+    """Create the app for an ASGI server.
+
+    The server's event loop handles connections and streams response bodies, while
+    requests are handled on a pool of ASGI_THREADS threads in each process, so one
+    slow request doesn't hold up a whole worker process as it does with sync gunicorn.
+    """
+    app = create_app(config_class)
+    return WSGIMiddleware(app, workers=app.config["ASGI_THREADS"])
+
+
 from app import models, user  # noqa: E402, F401
@@ -0,0 +1,99 @@
+from threading import BoundedSemaphore, Lock
+
+from flask import g, request
+from werkzeug.exceptions import ServiceUnavailable
+
+from app.metrics import Counter, Gauge
+
+# Endpoints that are never shed, so the service can still be monitored when it's overloaded
+EXEMPT = ("main.prometheus_metrics",)
+
+
+def endpoint_class():
+    """Get the class of the current request for admission control."""
+    if request.endpoint == "thing.thing_events":
+        return "events"
+    if request.endpoint == "auth.get_token":
+        return "auth"
+    if request.endpoint and request.endpoint.endswith("export"):
+        return "export"
+    if request.method in ("POST", "PUT", "PATCH", "DELETE"):
+        return "write"
+    return "read"
+
+
+class Admission(object):
+    """Caps the requests in flight in each process for each class of endpoint.
+
+    The classes are auth, events, export, read and write, limited by ADMISSION_AUTH,
+    ADMISSION_EVENTS and so on, where zero is unlimited. A request over its class's
+    limit is rejected straight away with a 503 and a Retry-After header, rather than
+    queueing for a database connection until it times out. Slots are held until the
+    response has been sent, so streamed exports count for as long as they run.
+    """
+
+    classes = ("auth", "events", "export", "read", "write")
+
+    def __init__(self):
+        self.limits = {}
+        self.slots = {}
+        self.in_flight = dict.fromkeys(self.classes, 0)
+        self.retry_after = 1
+        self._lock = Lock()
+        self.shed = Counter("http_requests_shed_total", "Requests rejected by admission control", labels=("class",))
+        self.in_flight_gauge = Gauge(
+            "http_requests_in_flight",
+            "Requests being handled, by admission control class",
+            lambda: {(name,): count for name, count in self.in_flight.items()},
+            labels=("class",),
+        )
+
+    def init_app(self, app):
+        self.limits = {name: app.config[f"ADMISSION_{name.upper()}"] for name in self.classes}
+        self.slots = {name: BoundedSemaphore(limit) for name, limit in self.limits.items() if limit > 0}
+        self.retry_after = app.config["ADMISSION_RETRY_AFTER"]
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        if request.endpoint in EXEMPT:
+            return
+        name = endpoint_class()
+        slots = self.slots.get(name)
+        if slots is not None and not slots.acquire(blocking=False):
+            self.shed.inc(**{"class": name})
+            raise ServiceUnavailable("Too many requests in progress, try again later", retry_after=self.retry_after)
+
+        with self._lock:
+            self.in_flight[name] += 1
+        self.in_flight_gauge.refresh()
+        g.admission = (name, slots)
+
+    def _after_request(self, response):
+        # Streamed bodies are sent after the request context ends, so hold the slot until they're closed
+        if not response.is_streamed or "admission" not in g:
+            return response
+
+        # Responses can be closed more than once when wrapped, so only the first close releases
+        pending = [g.pop("admission")]
+
+        def release():
+            if pending:
+                self._release(*pending.pop())
+
+        response.call_on_close(release)
+        return response
+
+    def _teardown_request(self, exception):
+        admission = g.pop("admission", None)
+        if admission is not None:
+            self._release(*admission)
+
+    def _release(self, name, slots):
+        with self._lock:
+            self.in_flight[name] -= 1
+        self.in_flight_gauge.refresh()
+        if slots is not None:
+            slots.release()
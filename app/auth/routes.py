@@ -1,9 +1,8 @@
-import json
-
 from flask import Response
 from flask_httpauth import HTTPBasicAuth
 from flask_negotiate import produces
 
+from app import db, hasher, serialiser
 from app.auth import bp
 from app.models import User
 
@@ -15,7 +14,7 @@ auth = HTTPBasicAuth()
 @auth.login_required
 def get_token():
     return Response(
-        json.dumps({"token": auth.current_user().generate_token()}, separators=(",", ":")),
+        serialiser.dumps({"token": auth.current_user().generate_token()}),
         mimetype="application/json",
         status=200,
     )
@@ -24,5 +23,13 @@ def get_token():
 @auth.verify_password
 def authenticate(email_address, password):
     user = User.query.filter_by(email_address=email_address).first()
-    if user and user.check_password(password):
+    if user is None:
+        # Hash anyway, so an unknown address can't be told apart from a wrong password by the time taken
+        hasher.check_dummy(password)
+        return None
+    if user.check_password(password):
+        # Transparently upgrade hashes made with a different cost
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
         return user
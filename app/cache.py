@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+import redis
+from flask import current_app
+
+
+class LocalCache(object):
+    """A size-bounded LRU cache with a TTL, private to the current process."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._items[key] = (value, monotonic() + (ttl or self.ttl))
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[1] >= monotonic():
+                return False
+            self._items[key] = (value, monotonic() + (ttl or self.ttl))
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class RedisCache(object):
+    """A cache with a TTL, shared between processes through Redis."""
+
+    def __init__(self, url, prefix, ttl):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key):
+        try:
+            return self.client.get(self.prefix + key)
+        except redis.RedisError:
+            current_app.logger.warning("Cache unavailable", exc_info=True)
+            return None
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.set(self.prefix + key, value, ex=ttl or self.ttl)
+        except redis.RedisError:
+            current_app.logger.warning("Cache unavailable", exc_info=True)
+
+    def add(self, key, value, ttl=None):
+        try:
+            return bool(self.client.set(self.prefix + key, value, ex=ttl or self.ttl, nx=True))
+        except redis.RedisError:
+            current_app.logger.warning("Cache unavailable", exc_info=True)
+            return True
+
+    def delete(self, key):
+        try:
+            self.client.delete(self.prefix + key)
+        except redis.RedisError:
+            current_app.logger.warning("Cache unavailable", exc_info=True)
+
+
+class TieredCache(object):
+    """A local cache in front of a shared one, filled from the shared cache on a local miss.
+
+    Deletes can't reach other processes' local caches, so this is only suitable for
+    entries that never change once set, such as those keyed by a version.
+    """
+
+    def __init__(self, local, shared):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, ttl)
+        self.shared.set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        added = self.shared.add(key, value, ttl)
+        if added:
+            self.local.set(key, value, ttl)
+        return added
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+
+class Cache(object):
+    """A cache configured from the app config with the given name as a prefix.
+
+    For example a cache named "token" reads TOKEN_CACHE_TTL, TOKEN_CACHE_SIZE and
+    TOKEN_CACHE_STORAGE_URL. Entries are stored in Redis if the storage URL is a
+    Redis URL, otherwise in process. A tiered cache also keeps up to SIZE entries in
+    process in front of Redis. A TTL of zero disables the cache.
+    """
+
+    def __init__(self, name, tiered=False):
+        self.name = name
+        self.tiered = tiered
+        self.backend = None
+
+    def init_app(self, app):
+        prefix = f"{self.name.upper()}_CACHE"
+        ttl = app.config[f"{prefix}_TTL"]
+        url = app.config.get(f"{prefix}_STORAGE_URL") or ""
+
+        if ttl <= 0:
+            self.backend = None
+        elif url.startswith(("redis://", "rediss://", "unix://")):
+            self.backend = RedisCache(url, f"{self.name}:", ttl)
+            if self.tiered:
+                self.backend = TieredCache(LocalCache(app.config[f"{prefix}_SIZE"], ttl), self.backend)
+        else:
+            self.backend = LocalCache(app.config[f"{prefix}_SIZE"], ttl)
+
+    def after_fork(self):
+        """Drop the Redis connections inherited from the parent process in a forked process."""
+        backend = self.backend.shared if isinstance(self.backend, TieredCache) else self.backend
+        if isinstance(backend, RedisCache):
+            backend.client.connection_pool.reset()
+
+    def get(self, key):
+        return self.backend.get(key) if self.backend else None
+
+    def set(self, key, value, ttl=None):
+        if self.backend:
+            self.backend.set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        """Set a key only if it isn't already set, returning whether it was.
+
+        Always returns True if the cache is disabled or unavailable.
+        """
+        return self.backend.add(key, value, ttl) if self.backend else True
+
+    def delete(self, key):
+        if self.backend:
+            self.backend.delete(key)
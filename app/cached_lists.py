@@ -0,0 +1,139 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, request
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import db, list_cache, serialiser
+from app.conditional import not_modified, not_modified_response
+from app.metrics import Counter
+from app.models import TableGeneration, dialect_insert
+
+# Tables with cached lists, whose generation is bumped when they're written to
+CACHED_TABLES = {"thing", "user_account"}
+
+list_cache_requests = Counter(
+    "list_cache_requests_total", "List requests served from or added to the list cache", labels=("endpoint", "result")
+)
+
+
+def cached_list(table_name):
+    """Serve a list view's responses from the list cache.
+
+    Entries are keyed by the table's generation, the query string, host and Accept
+    header, and hold the serialised response. A write to the table bumps its
+    generation in the same transaction, so the write and the bump are committed
+    together and later requests use new keys, and old entries are left to expire or
+    be evicted. An entry from before a write is never served after it.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if list_cache.backend is None:
+                return view(*args, **kwargs)
+
+            key = cache_key(generation(table_name))
+            stored = list_cache.get(key)
+            if stored is not None:
+                list_cache_requests.inc(endpoint=request.endpoint, result="hit")
+                return replay(serialiser.loads(stored))
+
+            list_cache_requests.inc(endpoint=request.endpoint, result="miss")
+            response = view(*args, **kwargs)
+            if response.status_code in (200, 204):
+                list_cache.set(key, serialiser.dumps(record(response)))
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def generation(table_name):
+    return table_version(table_name)[0]
+
+
+def table_version(table_name):
+    """Get a table's generation and the time it was last written to, or (0, None) if it never has been."""
+    version = db.session.execute(
+        select(TableGeneration.generation, TableGeneration.updated_at).where(TableGeneration.table_name == table_name)
+    ).one_or_none()
+    return tuple(version) if version else (0, None)
+
+
+def cache_key(generation):
+    args = urlencode(sorted(request.args.items(multi=True)))
+    accept = ",".join(sorted(request.headers.getlist("accept")))
+    return hashlib.sha256(f"{request.endpoint}:{generation}:{request.host}:{args}:{accept}".encode("UTF-8")).hexdigest()
+
+
+def record(response):
+    return {
+        "status": response.status_code,
+        "headers": [[name, value] for name, value in response.headers if name not in ("Content-Length", "Date")],
+        "body": response.get_data(as_text=True),
+    }
+
+
+def replay(stored):
+    response = Response(stored["body"], status=stored["status"], headers=stored["headers"])
+    etag = response.get_etag()[0]
+    if etag and not_modified(etag, response.last_modified):
+        return not_modified_response(etag, response.last_modified)
+    return response
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    _record_writes(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table_name = orm_execute_state.statement.table.name
+        if table_name in CACHED_TABLES:
+            orm_execute_state.session.info.setdefault("written_tables", set()).add(table_name)
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    # Flush any pending changes first, so the tables they write to are bumped too
+    session.flush()
+    table_names = session.info.pop("written_tables", None)
+    if table_names:
+        bump_generations(session, sorted(table_names))
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("written_tables", None)
+
+
+def _record_writes(session):
+    table_names = {instance.__table__.name for instance in (*session.new, *session.dirty, *session.deleted)}
+    if table_names & CACHED_TABLES:
+        session.info.setdefault("written_tables", set()).update(table_names & CACHED_TABLES)
+
+
+def bump_generations(session, table_names):
+    """Bump the generations of tables written to, as the last statements of the transaction that wrote them.
+
+    Concurrent writes to a table queue for the lock on its generation row from here
+    until they commit, so it's left until just before the commit. Tables are bumped
+    in name order, so transactions writing to both can't deadlock. If a bump fails,
+    the commit fails and the write is rolled back with it.
+    """
+    now = datetime.utcnow()
+    statement = dialect_insert(TableGeneration)
+    for table_name in table_names:
+        session.execute(
+            statement.values(table_name=table_name, generation=1, updated_at=now).on_conflict_do_update(
+                index_elements=["table_name"],
+                set_={"generation": TableGeneration.generation + 1, "updated_at": now},
+            )
+        )
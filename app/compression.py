@@ -0,0 +1,143 @@
+import gzip
+import zlib
+from functools import wraps
+from threading import Lock
+
+import brotli
+from flask import g, request
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Levels for payloads that are compressed once and cached, where size matters more than time
+STATIC_LEVELS = {"br": 11, "gzip": 9, "zstd": 19}
+
+# Most static payloads to keep compressed variants of, as a guard against views with changing bodies
+STATIC_CACHE_SIZE = 64
+
+ENCODINGS = ("zstd", "br", "gzip") if zstandard else ("br", "gzip")
+
+
+def compress(data, encoding, level):
+    """Compress a whole body with a content coding."""
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def compressor(encoding, level):
+    """Get functions to compress the next chunk of a body, flushed so it can be sent straight away, and to end it."""
+    if encoding == "gzip":
+        stream = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return lambda chunk: stream.compress(chunk) + stream.flush(zlib.Z_SYNC_FLUSH), stream.flush
+    if encoding == "br":
+        stream = brotli.Compressor(quality=level)
+        return lambda chunk: stream.process(chunk) + stream.flush(), stream.finish
+    stream = zstandard.ZstdCompressor(level=level).compressobj()
+    return lambda chunk: stream.compress(chunk) + stream.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), stream.flush
+
+
+def compress_chunks(chunks, encoding, level):
+    """Compress a streamed body a chunk at a time, without buffering it."""
+    compress_chunk, finish = compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield compress_chunk(chunk.encode("UTF-8") if isinstance(chunk, str) else chunk)
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+class Compression(object):
+    """Compresses responses with the best content coding the client accepts.
+
+    Codings are chosen from COMPRESSION_ENCODINGS in order of preference, where the
+    client accepts more than one equally (zstd needs the zstandard package). Only
+    content types in COMPRESSION_LEVELS are compressed, at the level set for each
+    coding. Bodies smaller than COMPRESSION_MIN_SIZE bytes are sent as they are, and
+    streamed bodies are compressed a chunk at a time as they're sent. Views that
+    return the same body to every request can be marked `static`, to compress it
+    once at the highest level and reuse it.
+
+    Compressed responses get a weak ETag, which still matches If-None-Match.
+    """
+
+    def __init__(self):
+        self.encodings = ENCODINGS
+        self.levels = {}
+        self.min_size = 0
+        self._static = {}
+        self._lock = Lock()
+
+    def init_app(self, app):
+        preferred = [encoding.strip() for encoding in app.config["COMPRESSION_ENCODINGS"].split(",")]
+        self.encodings = [encoding for encoding in preferred if encoding in ENCODINGS]
+        self.levels = app.config["COMPRESSION_LEVELS"]
+        self.min_size = app.config["COMPRESSION_MIN_SIZE"]
+        app.after_request(self._after_request)
+
+    def static(self, view):
+        """Mark a view as returning the same body to every request, so it's compressed once."""
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.compress_static = True
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    def _after_request(self, response):
+        levels = self.levels.get(response.mimetype)
+        if levels is None and response.status_code != 304:
+            return response
+        response.vary.add("Accept-Encoding")
+        if not self._compressible(response):
+            return response
+
+        encoding = request.accept_encodings.best_match([encoding for encoding in self.encodings if encoding in levels])
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_chunks(response.response, encoding, levels[encoding])
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            if g.get("compress_static"):
+                response.set_data(self._compress_static(data, encoding))
+            else:
+                response.set_data(compress(data, encoding, levels[encoding]))
+
+        response.direct_passthrough = False
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _compressible(self, response):
+        return (
+            200 <= response.status_code < 300
+            and response.status_code not in (204, 206)
+            and "Content-Encoding" not in response.headers
+            and not response.cache_control.no_transform
+        )
+
+    def _compress_static(self, data, encoding):
+        key = (encoding, data)
+        compressed = self._static.get(key)
+        if compressed is None:
+            compressed = compress(data, encoding, STATIC_LEVELS[encoding])
+            with self._lock:
+                if len(self._static) >= STATIC_CACHE_SIZE:
+                    self._static.clear()
+                self._static[key] = compressed
+        return compressed
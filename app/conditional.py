@@ -0,0 +1,52 @@
+import hashlib
+from datetime import timezone
+
+from flask import Response, request
+
+
+def make_etag(*parts):
+    """Make a strong ETag from the parts that identify a version of a representation."""
+    return hashlib.sha256(":".join(str(part) for part in parts).encode("UTF-8")).hexdigest()[:32]
+
+
+def collection_version(generation, last_modified):
+    """Get an ETag and last modified time for a collection from its table's generation.
+
+    The generation is bumped in the same transaction as every write to the table, so
+    the ETag changes when an item is created, updated or deleted, without counting
+    the items, and differs for each page, filter, sort order and content type. The
+    last modified time is that of the last write to the table. A table that's never
+    been written to through the app may still have rows, loaded by migrations or
+    directly, so its collections get neither and are never reported as not modified.
+    """
+    if last_modified is None:
+        return None, None
+    etag = make_etag(generation, request.query_string.decode("UTF-8"), request.headers.get("Accept"))
+    return etag, last_modified
+
+
+def not_modified(etag, last_modified):
+    """Check if the client already has this version, from If-None-Match or If-Modified-Since."""
+    if etag is None:
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified):
+    """Add ETag and Last-Modified headers to a response, if there's a version to give."""
+    if etag is None:
+        return response
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+def not_modified_response(etag, last_modified):
+    return set_validators(Response(status=304), etag, last_modified)
@@ -0,0 +1,131 @@
+import select
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+from time import sleep
+
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+CHANNEL = "thing_events"
+
+
+class Events(object):
+    """Publishes Thing change events to subscribers, such as Server-Sent Events streams.
+
+    Events are queued on the session that made the change and only sent once it
+    commits. On PostgreSQL they're sent with NOTIFY, and a thread in each process
+    LISTENs for them, so subscribers see changes made by every process. Elsewhere
+    they're only delivered within the process that made them. A subscriber that
+    falls more than EVENTS_QUEUE_SIZE events behind is dropped, and should resync
+    with updated_since when it reconnects.
+    """
+
+    def __init__(self, serialiser):
+        self.serialiser = serialiser
+        self.queue_size = 0
+        self.heartbeat = 0
+        self._subscribers = set()
+        self._listener = None
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.queue_size = app.config["EVENTS_QUEUE_SIZE"]
+        self.heartbeat = app.config["EVENTS_HEARTBEAT"]
+        app.extensions["events"] = self
+
+        if not event.contains(Session, "before_commit", self._before_commit):
+            event.listen(Session, "before_commit", self._before_commit)
+            event.listen(Session, "after_commit", self._after_commit)
+            event.listen(Session, "after_rollback", self._after_rollback)
+
+    def after_fork(self):
+        """Forget the parent process's subscribers and listener thread in a forked process."""
+        self._subscribers = set()
+        self._listener = None
+        self._lock = Lock()
+
+    def publish(self, session, type, data):
+        """Queue an event to be sent when the session commits."""
+        message = b"event: " + type.encode("UTF-8") + b"\ndata: " + self.serialiser.dumps(data) + b"\n\n"
+        session.info.setdefault("events", []).append(message)
+
+    def subscribe(self):
+        """Start receiving events, returning the queue they're delivered to."""
+        if current_app.extensions["sqlalchemy"].engine.dialect.name == "postgresql":
+            self._start_listener(current_app.extensions["sqlalchemy"].engine, current_app.logger)
+
+        subscription = Queue(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def receive(self, subscription):
+        """Yield events from a subscription as they arrive, or None every heartbeat interval without one.
+
+        Stops if the subscriber is dropped for falling behind, and unsubscribes when closed.
+        """
+        try:
+            while subscription in self._subscribers:
+                try:
+                    yield subscription.get(timeout=self.heartbeat)
+                except Empty:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscription)
+
+    def deliver(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(message)
+            except Full:
+                with self._lock:
+                    self._subscribers.discard(subscription)
+
+    def _before_commit(self, session):
+        messages = session.info.get("events")
+        if messages and session.get_bind().dialect.name == "postgresql":
+            # One round trip however many events there are, delivered by the listener once committed
+            session.execute(
+                text("SELECT pg_notify(:channel, message) FROM unnest(CAST(:messages AS text[])) AS message"),
+                {"channel": CHANNEL, "messages": [message.decode("UTF-8") for message in messages]},
+            )
+            del session.info["events"]
+
+    def _after_commit(self, session):
+        for message in session.info.pop("events", ()):
+            self.deliver(message)
+
+    def _after_rollback(self, session):
+        session.info.pop("events", None)
+
+    def _start_listener(self, engine, logger):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = Thread(target=self._listen, args=(engine, logger), name="events", daemon=True)
+                self._listener.start()
+
+    def _listen(self, engine, logger):
+        while True:
+            connection = None
+            try:
+                # A connection of its own, rather than one held out of the pool
+                connection = engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                dbapi_connection.cursor().execute(f"LISTEN {CHANNEL}")
+
+                while True:
+                    select.select([dbapi_connection], [], [], self.heartbeat)
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        self.deliver(dbapi_connection.notifies.pop(0).payload.encode("UTF-8"))
+            except Exception:
+                logger.warning("Event listener disconnected, reconnecting", exc_info=True)
+                if connection is not None:
+                    connection.close()
+                sleep(1)
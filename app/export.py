@@ -0,0 +1,191 @@
+import csv
+from datetime import datetime
+from io import StringIO
+from uuid import UUID
+
+from flask import Response, request
+from sqlalchemy import DateTime, Integer, Uuid
+
+from app import serialiser
+from app.pool import set_statement_timeout
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+NDJSON = "application/x-ndjson"
+PARQUET = "application/vnd.apache.parquet"
+
+# Content types exports can be streamed as, in order of preference when the client accepts several
+EXPORT_TYPES = ("application/json", "text/csv", NDJSON) + ((ARROW_STREAM, PARQUET) if pyarrow else ())
+
+# File name extensions of the types that are downloaded as attachments
+EXTENSIONS = {"text/csv": "csv", ARROW_STREAM: "arrows", PARQUET: "parquet"}
+
+
+def stream_rows(engine, statement, chunk_size, statement_timeout=None):
+    """Execute a statement on a server-side cursor and yield the rows in chunks.
+
+    Rows are plain tuples rather than ORM entities, and only one chunk is held in
+    memory at a time, so memory use doesn't grow with the size of the result. The
+    statement timeout in milliseconds replaces the database's default if given.
+    """
+    with engine.connect() as connection:
+        if statement_timeout is not None:
+            set_statement_timeout(connection, statement_timeout)
+        result = connection.execution_options(yield_per=chunk_size).execute(statement)
+        for rows in result.partitions():
+            yield rows
+
+
+def generate_csv(chunks, header):
+    """Generate CSV text with a header row followed by one write per chunk of rows."""
+    data = StringIO()
+    w = csv.writer(data)
+
+    # write header
+    w.writerow(header)
+    yield data.getvalue()
+    data.seek(0)
+    data.truncate(0)
+
+    # write each chunk
+    for rows in chunks:
+        w.writerows([_serialise(value) for value in row] for row in rows)
+        yield data.getvalue()
+        data.seek(0)
+        data.truncate(0)
+
+
+def generate_json(chunks, keys):
+    """Generate a JSON array of objects with one write per chunk of rows."""
+    separator = b"["
+    for rows in chunks:
+        # Each chunk is serialised as an array, then spliced into the whole without its brackets
+        yield separator + serialiser.dump_rows(keys, rows)[1:-1]
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def generate_ndjson(chunks, keys):
+    """Generate newline delimited JSON, one object per row, with one write per chunk of rows."""
+    for rows in chunks:
+        yield b"".join(serialiser.dumps(dict(zip(keys, row))) + b"\n" for row in rows)
+
+
+def arrow_schema(columns):
+    """Get an Arrow schema for model columns, with UUID and UTC timestamp types rather than strings."""
+    return pyarrow.schema([pyarrow.field(column.key, _arrow_type(column.type)) for column in columns])
+
+
+def record_batch(rows, schema):
+    """Convert a chunk of row tuples to an Arrow record batch."""
+    values = list(zip(*rows)) or [()] * len(schema)
+    return pyarrow.RecordBatch.from_arrays(
+        [_arrow_array(column, field.type) for column, field in zip(values, schema)], schema=schema
+    )
+
+
+def generate_arrow(chunks, schema):
+    """Generate an Arrow IPC stream, with a record batch for each chunk of rows."""
+    sink = _Sink()
+    with pyarrow.ipc.new_stream(pyarrow.PythonFile(sink, mode="w"), schema) as writer:
+        yield sink.take()
+        for rows in chunks:
+            writer.write_batch(record_batch(rows, schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def generate_parquet(chunks, schema):
+    """Generate a zstd compressed Parquet file, with a row group for each chunk of rows."""
+    sink = _Sink()
+    with pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode="w"), schema, compression="zstd") as writer:
+        for rows in chunks:
+            writer.write_batch(record_batch(rows, schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def export_response(chunks, columns, name):
+    """Stream rows from a column query in the export format the client prefers.
+
+    JSON and NDJSON objects use the column names as keys, and CSV has them in upper
+    case in a header row. Arrow and Parquet, when pyarrow is installed, keep UUIDs
+    and timestamps typed, and CSV, Arrow and Parquet are sent as attachments.
+    """
+    keys = [column.key for column in columns]
+    mimetype = request.accept_mimetypes.best_match(EXPORT_TYPES)
+    if mimetype == "text/csv":
+        body = generate_csv(chunks, [key.upper() for key in keys])
+    elif mimetype == NDJSON:
+        body = generate_ndjson(chunks, keys)
+    elif mimetype == ARROW_STREAM:
+        body = generate_arrow(chunks, arrow_schema(columns))
+    elif mimetype == PARQUET:
+        body = generate_parquet(chunks, arrow_schema(columns))
+    else:
+        body = generate_json(chunks, keys)
+
+    response = Response(body, mimetype=mimetype, status=200)
+    if mimetype in EXTENSIONS:
+        response.headers.set("Content-Disposition", "attachment", filename=f"{name}.{EXTENSIONS[mimetype]}")
+    return response
+
+
+class _Sink(object):
+    """A write-only file for pyarrow writers that hands over what's been written so far, to be streamed."""
+
+    def __init__(self):
+        self.closed = False
+        self.position = 0
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_type(type):
+    if isinstance(type, Uuid):
+        return pyarrow.uuid()
+    if isinstance(type, DateTime):
+        return pyarrow.timestamp("us", tz="UTC")
+    if isinstance(type, Integer):
+        return pyarrow.int64()
+    return pyarrow.string()
+
+
+def _arrow_array(values, type):
+    if type == pyarrow.uuid():
+        storage = pyarrow.array([_uuid_bytes(value) for value in values], pyarrow.binary(16))
+        return pyarrow.ExtensionArray.from_storage(type, storage)
+    return pyarrow.array(values, type)
+
+
+def _uuid_bytes(value):
+    if value is None:
+        return None
+    return value.bytes if isinstance(value, UUID) else UUID(value).bytes
+
+
+def _serialise(value):
+    return value.isoformat() if isinstance(value, datetime) else value
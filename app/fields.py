@@ -0,0 +1,27 @@
+from flask import request
+from werkzeug.exceptions import BadRequest
+
+
+def requested_fields(allowed, default):
+    """Get the attributes to include in a response from the comma separated fields parameter.
+
+    Fields are validated against the allowed attributes and returned in that order,
+    or the default is returned if the parameter isn't given.
+    """
+    value = request.args.get("fields", type=str)
+    if not value:
+        return default
+
+    fields = {field.strip() for field in value.split(",")}
+    if not fields <= set(allowed):
+        raise BadRequest(f"Fields must be from {', '.join(allowed)}")
+    return tuple(field for field in allowed if field in fields)
+
+
+def field_columns(model, fields, *required):
+    """Get the model columns for the fields, followed by any required columns not among them.
+
+    Rows selected with these columns start with the field values, so they can be
+    serialised by zipping with the fields, which drops the extra columns.
+    """
+    return [getattr(model, field) for field in fields] + [column for column in required if column.key not in fields]
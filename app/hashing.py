@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from time import perf_counter
+
+import bcrypt
+from werkzeug.exceptions import ServiceUnavailable
+
+from app.instrumentation import timed
+from app.metrics import Counter, Gauge, Histogram
+
+
+class Hasher(object):
+    """Runs bcrypt on a bounded pool of worker threads.
+
+    bcrypt releases the GIL, so hashing on a small dedicated pool caps the CPU that
+    password checks can take from the rest of the app. Once every worker is busy and
+    the queue is full, further requests are rejected with a 503 and a Retry-After
+    header instead of piling up behind each other.
+    """
+
+    def __init__(self):
+        self.rounds = 12
+        self.retry_after = 1
+        self.workers = 0
+        self.executor = None
+        self.slots = None
+        self.queued = 0
+        self._dummy = None
+        self._lock = Lock()
+        self.latency = Histogram(
+            "bcrypt_duration_seconds",
+            "Time taken to hash or check a password",
+            buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5),
+            labels=("operation",),
+        )
+        self.rejected = Counter("bcrypt_rejected_total", "Password hashes rejected because the queue was full")
+        self.queue_depth = Gauge("bcrypt_queue_depth", "Password hashes waiting for a worker", lambda: self.queued)
+
+    def init_app(self, app):
+        self.workers = app.config["HASHING_WORKERS"]
+        self.rounds = app.config["BCRYPT_ROUNDS"]
+        self._dummy = None
+        self.retry_after = app.config["HASHING_RETRY_AFTER"]
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self.slots = BoundedSemaphore(self.workers + app.config["HASHING_QUEUE_SIZE"])
+
+    def after_fork(self):
+        """Start a new thread pool in a forked process, as the parent's threads don't exist in it."""
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self.queued = 0
+        self._lock = Lock()
+        self.queue_depth.refresh()
+
+    def hash(self, password):
+        """Hash a password with the configured cost."""
+        return self._run("hash", bcrypt.hashpw, password.encode("UTF-8"), bcrypt.gensalt(self.rounds))
+
+    def check(self, password, hashed):
+        """Check a password against a hash."""
+        return self._run("check", bcrypt.checkpw, password.encode("UTF-8"), hashed)
+
+    def check_dummy(self, password):
+        """Check a password against a hash of nothing, taking as long as a real check would."""
+        if self._dummy is None:
+            self._dummy = bcrypt.hashpw(b"", bcrypt.gensalt(self.rounds))
+        self.check(password, self._dummy)
+
+    def needs_rehash(self, hashed):
+        """Check if a hash was made with a different cost to the configured one."""
+        return int(hashed.split(b"$")[2]) != self.rounds
+
+    def _run(self, operation, function, *args):
+        if self.executor is None:
+            with timed("bcrypt"):
+                return function(*args)
+        if not self.slots.acquire(blocking=False):
+            self.rejected.inc()
+            raise ServiceUnavailable("Too many password requests, try again later", retry_after=self.retry_after)
+        try:
+            with self._lock:
+                self.queued += 1
+            self.queue_depth.refresh()
+            with timed("bcrypt"):
+                return self.executor.submit(self._timed, operation, function, *args).result()
+        finally:
+            self.slots.release()
+
+    def _timed(self, operation, function, *args):
+        with self._lock:
+            self.queued -= 1
+        self.queue_depth.refresh()
+        start = perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.latency.observe(perf_counter() - start, operation=operation)
@@ -0,0 +1,97 @@
+import hashlib
+from functools import wraps
+from time import monotonic, sleep
+
+from flask import Response, current_app, request
+from werkzeug.exceptions import BadRequest, Conflict, HTTPException, UnprocessableEntity
+
+from app import idempotency_cache, serialiser
+from app.ratelimit import rate_limit_key
+
+# Long enough for any request to finish, so a crashed request's claim doesn't block retries for long
+CLAIM_TTL = 60
+
+
+def idempotent(view):
+    """Make a view replay its first response to requests with the same Idempotency-Key header.
+
+    The first request with a key claims it, runs the view and stores the response in
+    the idempotency cache for IDEMPOTENCY_CACHE_TTL seconds. Retries get the stored
+    response without running the view again, and concurrent duplicates wait up to
+    IDEMPOTENCY_WAIT seconds for it rather than running alongside. Keys are scoped
+    to the principal and path, and reusing one with a different body is an error.
+    Server errors and 429s aren't stored, so they can be retried.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > 255:
+            raise BadRequest("Idempotency-Key must be between 1 and 255 characters")
+
+        cache_key = hashlib.sha256(f"{request.path}:{rate_limit_key()}:{key}".encode("UTF-8")).hexdigest()
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+        stored = idempotency_cache.get(cache_key) or claim(cache_key)
+        if stored is not None:
+            return replay(serialiser.loads(stored), fingerprint)
+
+        try:
+            response = run(view, *args, **kwargs)
+            if response.status_code < 500 and response.status_code != 429:
+                idempotency_cache.set(cache_key, serialiser.dumps(record(response, fingerprint)))
+            return response
+        finally:
+            idempotency_cache.delete(f"{cache_key}:claim")
+
+    return wrapper
+
+
+def run(view, *args, **kwargs):
+    """Run a view, turning HTTP errors into responses so they can be stored too."""
+    try:
+        return current_app.make_response(view(*args, **kwargs))
+    except HTTPException as e:
+        return current_app.make_response(current_app.handle_user_exception(e))
+
+
+def claim(cache_key):
+    """Claim a key, or wait for a concurrent request that claimed it to store its response.
+
+    Returns the stored response, or None once claimed. If the other request finishes
+    without storing a response, such as after a server error, this one claims the key.
+    """
+    deadline = monotonic() + current_app.config["IDEMPOTENCY_WAIT"]
+    while True:
+        if idempotency_cache.add(f"{cache_key}:claim", b"1", CLAIM_TTL):
+            # The other request may have stored its response and finished since the last check
+            stored = idempotency_cache.get(cache_key)
+            if stored is not None:
+                idempotency_cache.delete(f"{cache_key}:claim")
+            return stored
+
+        stored = idempotency_cache.get(cache_key)
+        if stored is not None:
+            return stored
+        if monotonic() >= deadline:
+            raise Conflict("A request with this Idempotency-Key is still in progress")
+        sleep(0.05)
+
+
+def record(response, fingerprint):
+    return {
+        "fingerprint": fingerprint,
+        "status": response.status_code,
+        "headers": [[name, value] for name, value in response.headers if name not in ("Content-Length", "Date")],
+        "body": response.get_data(as_text=True),
+    }
+
+
+def replay(stored, fingerprint):
+    if stored["fingerprint"] != fingerprint:
+        raise UnprocessableEntity("Idempotency-Key was already used with a different request body")
+    response = Response(stored["body"], status=stored["status"], headers=stored["headers"])
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
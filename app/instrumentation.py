@@ -0,0 +1,148 @@
+import json
+from collections import Counter as StatementCounter
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.metrics import Counter, Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time taken to handle a request, excluding streamed response bodies",
+    buckets=LATENCY_BUCKETS,
+    labels=("method", "endpoint"),
+)
+request_count = Counter("http_requests_total", "Requests handled", labels=("method", "endpoint", "status"))
+sql_duration = Histogram(
+    "http_request_sql_duration_seconds",
+    "Total time spent executing SQL statements for a request",
+    buckets=LATENCY_BUCKETS,
+    labels=("method", "endpoint"),
+)
+slow_queries = Counter("sql_slow_queries_total", "SQL statements slower than SLOW_QUERY_THRESHOLD")
+repeated_queries = Counter(
+    "sql_repeated_queries_total",
+    "Requests that ran the same SQL statement more than N_PLUS_ONE_THRESHOLD times",
+    labels=("endpoint",),
+)
+
+
+@contextmanager
+def timed(name):
+    """Add the time taken by a block of code to the current request's timings under a name."""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        record(name, perf_counter() - start)
+
+
+def record(name, seconds):
+    if has_request_context() and "timings" in g:
+        g.timings[name] += seconds
+
+
+class Instrumentation(object):
+    """Records where the time goes in each request.
+
+    Counts and times SQL statements through engine events, and times password
+    hashing, tokens and serialisation through `timed`. At the end of each request
+    these are added to the Prometheus metrics, written as a structured log line and,
+    if SERVER_TIMING is enabled, returned in a Server-Timing header. Slow SQL
+    statements, and statements repeated more often than a threshold in one request
+    (usually an N+1 query pattern), are logged as warnings.
+    """
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _handle_error)
+
+    def _before_request(self):
+        g.request_start = perf_counter()
+        g.timings = defaultdict(float)
+        g.statements = StatementCounter()
+
+    def _after_request(self, response):
+        if "request_start" not in g:
+            return response
+
+        duration = perf_counter() - g.request_start
+        endpoint = request.endpoint or "none"
+        query_count = sum(g.statements.values())
+
+        request_duration.observe(duration, method=request.method, endpoint=endpoint)
+        request_count.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+        sql_duration.observe(g.timings["sql"], method=request.method, endpoint=endpoint)
+        self._check_repeated_queries(endpoint)
+
+        if current_app.config["SERVER_TIMING"]:
+            metrics = [f'sql;dur={g.timings["sql"] * 1000:.1f};desc="{query_count} queries"']
+            metrics += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in g.timings.items() if name != "sql"]
+            metrics.append(f"total;dur={duration * 1000:.1f}")
+            response.headers["Server-Timing"] = ", ".join(metrics)
+
+        current_app.logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "endpoint": endpoint,
+                    "status": response.status_code,
+                    "duration_ms": round(duration * 1000, 1),
+                    "queries": query_count,
+                    **{f"{name}_ms": round(seconds * 1000, 1) for name, seconds in g.timings.items()},
+                },
+                separators=(",", ":"),
+            )
+        )
+        return response
+
+    def _check_repeated_queries(self, endpoint):
+        threshold = current_app.config["N_PLUS_ONE_THRESHOLD"]
+        for statement, count in g.statements.items():
+            if count > threshold:
+                repeated_queries.inc(endpoint=endpoint)
+                current_app.logger.warning(
+                    f"Possible N+1 query in {endpoint}, statement ran {count} times: {statement[:200]}"
+                )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context, so nothing is left behind on the connection if it fails
+    if context is not None:
+        context.query_start = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_statement(statement, context)
+
+
+def _handle_error(exception_context):
+    # Failed statements don't reach after_cursor_execute, but their time still counts
+    _record_statement(exception_context.statement, exception_context.execution_context)
+
+
+def _record_statement(statement, context):
+    start = getattr(context, "query_start", None)
+    if start is None or not has_app_context():
+        return
+    duration = perf_counter() - start
+
+    if has_request_context() and "statements" in g:
+        g.statements[statement] += 1
+        g.timings["sql"] += duration
+
+    if duration * 1000 > current_app.config["SLOW_QUERY_THRESHOLD"]:
+        slow_queries.inc()
+        current_app.logger.warning(f"Slow query took {duration * 1000:.1f}ms: {statement[:200]}")
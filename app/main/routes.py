@@ -1,32 +1,40 @@
-import json
+from hmac import compare_digest
 
-from flask import Response
+from flask import Response, abort, current_app, request
 from werkzeug.exceptions import HTTPException, InternalServerError
 
+from app import compression, limiter, metrics, serialiser
+from app.conditional import not_modified, not_modified_response, set_validators
 from app.main import bp
+from app.openapi import document, document_etag
 
 
 @bp.route("/openapi", methods=["GET"])
+@compression.static
 def openapi():
-    with open("openapi.json") as openapi_json:
-        openapi = json.load(openapi_json)
+    if not_modified(document_etag, None):
+        return not_modified_response(document_etag, None)
+    return set_validators(Response(document, mimetype="application/json", status=200), document_etag, None)
 
-    return Response(
-        json.dumps(openapi, separators=(",", ":")),
-        mimetype="application/json",
-        status=200,
-    )
+
+@bp.route("/metrics", methods=["GET"])
+@limiter.exempt
+def prometheus_metrics():
+    token = current_app.config["METRICS_TOKEN"]
+    if token and not compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        abort(401)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4", status=200)
 
 
 @bp.app_errorhandler(HTTPException)
 def http_error(error):
+    # Keep headers such as Retry-After and Allow, but not the HTML content type
+    headers = [(key, value) for key, value in error.get_headers() if key != "Content-Type"]
     return Response(
-        response=json.dumps(
-            {"code": error.code, "name": error.name, "description": error.description},
-            separators=(",", ":"),
-        ),
+        response=serialiser.dumps({"code": error.code, "name": error.name, "description": error.description}),
         mimetype="application/json",
         status=error.code,
+        headers=headers,
     )
 
 
@@ -0,0 +1,87 @@
+import os
+
+import prometheus_client
+from prometheus_client import CollectorRegistry, generate_latest, multiprocess
+
+# Counters only get a _total sample, as they did before they were kept by prometheus_client
+prometheus_client.disable_created_metrics()
+
+# Metrics exposed at /metrics by this process
+registry = CollectorRegistry(auto_describe=True)
+
+# Gauges to refresh from their functions before the metrics are collected
+gauges = []
+
+
+def multiprocess_dir():
+    """Get the directory metrics are shared between worker processes through, if there is one.
+
+    prometheus_client reads PROMETHEUS_MULTIPROC_DIR when it's imported, so it must be
+    set before the app is, as gunicorn.conf.py does.
+    """
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+class Counter(object):
+    """A value that only goes up, optionally split by labels."""
+
+    def __init__(self, name, help, labels=()):
+        self.labels = labels
+        self._metric = prometheus_client.Counter(name, help, labels, registry=registry)
+
+    def inc(self, amount=1, **labels):
+        (self._metric.labels(**labels) if self.labels else self._metric).inc(amount)
+
+    def samples(self):
+        for metric in self._metric.collect():
+            for sample in metric.samples:
+                yield sample.name, sample.labels, sample.value
+
+
+class Gauge(object):
+    """A value read from a function, optionally split by labels.
+
+    With labels, the function returns a dict of values keyed by tuples of label values.
+    The value is read when the metrics are collected, and should also be refreshed
+    whenever it changes, as other processes collect it from the shared directory
+    rather than by calling the function. Values are summed across live processes.
+    """
+
+    def __init__(self, name, help, function, labels=()):
+        self.function = function
+        self.labels = labels
+        self._metric = prometheus_client.Gauge(name, help, labels, registry=registry, multiprocess_mode="livesum")
+        gauges.append(self)
+
+    def refresh(self):
+        if not self.labels:
+            self._metric.set(self.function())
+            return
+        for key, value in self.function().items():
+            self._metric.labels(*key).set(value)
+
+
+class Histogram(object):
+    """Counts of observed values in cumulative buckets, optionally split by labels."""
+
+    def __init__(self, name, help, buckets, labels=()):
+        self.labels = labels
+        self._metric = prometheus_client.Histogram(name, help, labels, buckets=buckets, registry=registry)
+
+    def observe(self, value, **labels):
+        (self._metric.labels(**labels) if self.labels else self._metric).observe(value)
+
+
+def render():
+    """Render every metric in the Prometheus text exposition format.
+
+    With a multiprocess directory, these are the metrics of every worker process,
+    otherwise only this one's.
+    """
+    for gauge in gauges:
+        gauge.refresh()
+    if multiprocess_dir():
+        collector = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector)
+        return generate_latest(collector)
+    return generate_latest(registry)
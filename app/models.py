@@ -1,21 +1,47 @@
-import json
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from time import time
 
-import bcrypt
 import jwt
 from flask import current_app
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import delete, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from werkzeug.exceptions import Forbidden, NotFound
 
-from app import db
+from app import db, events, hasher, serialiser, token_cache
+from app.conditional import make_etag
+from app.instrumentation import timed
+from app.serialisation import parse_datetime
+
+# The trigram indexes need the pg_trgm extension
+db.event.listen(
+    db.metadata,
+    "before_create",
+    db.DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
 
 
 class User(db.Model):
     __tablename__ = "user_account"
+    __table_args__ = (
+        # Email addresses are stored normalised, so the unique index can't be bypassed by case
+        db.CheckConstraint("email_address = lower(email_address)", name="ck_user_account_email_address_lower"),
+        # Keyset pagination indexes
+        db.Index("ix_user_account_created_at_id", "created_at", "id"),
+        db.Index("ix_user_account_updated_at_id", "updated_at", "id"),
+        # Substring search index
+        db.Index(
+            "ix_user_account_email_address_trgm",
+            "email_address",
+            postgresql_using="gin",
+            postgresql_ops={"email_address": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     # Fields
-    id = db.Column(UUID, primary_key=True)
+    id = db.Column(db.Uuid(as_uuid=False), primary_key=True)
     password = db.Column(db.LargeBinary, nullable=False)
     email_address = db.Column(db.String(256), nullable=False, unique=True, index=True)
     created_at = db.Column(db.DateTime(timezone=True), nullable=False)
@@ -27,51 +53,155 @@ class User(db.Model):
     # Methods
     def __init__(self, email_address, password):
         self.id = str(uuid.uuid4())
-        self.email_address = email_address.lower().strip()
+        self.email_address = normalise_email_address(email_address)
         self.created_at = datetime.utcnow()
         self.set_password(password)
 
+    @staticmethod
+    def create(email_address, password):
+        """Create a User, or return None if the email address is already taken.
+
+        The row is inserted with ON CONFLICT DO NOTHING before the password is hashed,
+        so a taken address costs one statement and no bcrypt work, and the unique index
+        decides between concurrent requests for the same address.
+        """
+        statement = insert_ignoring_conflicts(
+            User,
+            id=str(uuid.uuid4()),
+            email_address=normalise_email_address(email_address),
+            password=b"",
+            created_at=datetime.utcnow(),
+        ).returning(User)
+        user = db.session.scalars(statement).one_or_none()
+        if user is not None:
+            user.set_password(password)
+        return user
+
+    def change_email_address(self, email_address):
+        """Change the email address, returning False if another User has it.
+
+        The change is written straight away with one UPDATE, so a taken address is found
+        before the caller does anything expensive, like hashing a new password. The
+        transaction is rolled back if it is taken.
+        """
+        email_address = normalise_email_address(email_address)
+        if email_address == self.email_address:
+            return True
+        try:
+            db.session.execute(update(User).where(User.id == self.id).values(email_address=email_address))
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        return True
+
     def __repr__(self):
-        return json.dumps(self.as_dict(), separators=(",", ":"))
+        with timed("serialise"):
+            return serialiser.dumps(self.as_dict()).decode("UTF-8")
 
     def as_dict(self):
         return {
             "id": self.id,
             "email_address": self.email_address,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
 
-    def list_item(self):
-        return {"id": self.id, "email_address": self.email_address}
+    @property
+    def last_modified(self):
+        return self.updated_at or self.created_at
+
+    @property
+    def etag(self):
+        return make_etag(self.id, self.last_modified.isoformat())
 
     def set_password(self, password):
-        self.password = bcrypt.hashpw(password.encode("UTF-8"), bcrypt.gensalt())
+        self.password = hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode("UTF-8"), self.password)
+        return hasher.check(password, self.password)
+
+    def password_needs_rehash(self):
+        return hasher.needs_rehash(self.password)
 
     def generate_token(self, expiration=3600):
-        return jwt.encode(
-            {"sub": self.id, "exp": time() + expiration},
-            current_app.config["SECRET_KEY"],
-            algorithm="HS256",
-        )
+        with timed("jwt"):
+            return jwt.encode(
+                {"sub": self.id, "exp": time() + expiration},
+                current_app.config["SECRET_KEY"],
+                algorithm="HS256",
+            )
 
     @staticmethod
     def verify_token(token):
         try:
-            id = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])["sub"]
+            with timed("jwt"):
+                id = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])["sub"]
         except jwt.PyJWTError:
             return None
-        return User.query.get(id)
+        return User.get_principal(id)
+
+    @staticmethod
+    def get_principal(id):
+        """Get a User by ID from the token cache, falling back to the database."""
+        cached = token_cache.get(id)
+        if cached is not None:
+            return User.from_cache(cached)
+
+        user = User.query.get(id)
+        if user:
+            token_cache.set(id, user.to_cache())
+        return user
+
+    def to_cache(self):
+        # The password hash is deliberately left out, it's loaded from the database if needed
+        return serialiser.dumps(
+            {
+                "id": self.id,
+                "email_address": self.email_address,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+            }
+        )
+
+    @staticmethod
+    def from_cache(cached):
+        values = serialiser.loads(cached)
+        user = User.__mapper__.class_manager.new_instance()
+        user.id = values["id"]
+        user.email_address = values["email_address"]
+        user.created_at = parse_datetime(values["created_at"])
+        user.updated_at = parse_datetime(values["updated_at"]) if values["updated_at"] else None
+
+        # Attach to the session as if loaded by a query, without querying
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
 
 
 class Thing(db.Model):
+    __table_args__ = (
+        # Keyset pagination indexes
+        db.Index("ix_thing_name_id", "name", "id"),
+        db.Index("ix_thing_colour_id", "colour", "id"),
+        db.Index("ix_thing_created_at_id", "created_at", "id"),
+        db.Index("ix_thing_updated_at_id", "updated_at", "id"),
+        # Substring and full-text search indexes
+        db.Index(
+            "ix_thing_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        db.Index(
+            "ix_thing_name_tsvector",
+            db.text("to_tsvector('simple', name)"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
     # Fields
-    id = db.Column(UUID, primary_key=True)
+    id = db.Column(db.Uuid(as_uuid=False), primary_key=True)
     user_id = db.Column(
-        UUID,
+        db.Uuid(as_uuid=False),
         db.ForeignKey("user_account.id", ondelete="CASCADE"),
         nullable=False,
         index=True,
@@ -90,7 +220,8 @@ class Thing(db.Model):
         self.created_at = datetime.utcnow()
 
     def __repr__(self):
-        return json.dumps(self.as_dict(), separators=(",", ":"))
+        with timed("serialise"):
+            return serialiser.dumps(self.as_dict()).decode("UTF-8")
 
     def as_dict(self):
         return {
@@ -98,13 +229,137 @@ class Thing(db.Model):
             "name": self.name,
             "colour": self.colour,
             "user_id": self.user_id,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
 
-    def list_item(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "colour": self.colour,
-        }
+    @property
+    def last_modified(self):
+        return self.updated_at or self.created_at
+
+    @property
+    def etag(self):
+        return make_etag(self.id, self.last_modified.isoformat())
+
+
+class ThingDailyCount(db.Model):
+    """The number of Things each User created on each day in each colour.
+
+    Maintained on PostgreSQL by statement level triggers on the thing table, so it
+    stays correct for bulk writes and cascading deletes too, and used for stats
+    when STATS_SUMMARY is enabled. The triggers are installed whether or not it is,
+    so the table is already correct when it's turned on.
+    """
+
+    user_id = db.Column(db.Uuid(as_uuid=False), primary_key=True)
+    colour = db.Column(db.String(), primary_key=True)
+    day = db.Column(db.DateTime(timezone=True), primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+
+
+class ThingTombstone(db.Model):
+    """A record of a deleted Thing, so clients syncing changes know to remove it."""
+
+    __table_args__ = (db.Index("ix_thing_tombstone_deleted_at_id", "deleted_at", "id"),)
+
+    id = db.Column(db.Uuid(as_uuid=False), primary_key=True)
+    user_id = db.Column(db.Uuid(as_uuid=False), nullable=False)
+    deleted_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+
+class TableGeneration(db.Model):
+    """A counter bumped by each transaction that writes to a table, used to version lists of it."""
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    generation = db.Column(db.BigInteger, nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+
+# Keep thing_daily_count up to date with each statement that writes to thing
+thing_daily_count_triggers = """
+CREATE OR REPLACE FUNCTION refresh_thing_daily_count() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE thing_daily_count AS c SET count = c.count - o.count
+        FROM (
+            SELECT user_id, colour, date_trunc('day', created_at) AS day, count(*) AS count
+            FROM old_rows GROUP BY 1, 2, 3
+        ) AS o
+        WHERE c.user_id = o.user_id AND c.colour = o.colour AND c.day = o.day;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO thing_daily_count (user_id, colour, day, count)
+        SELECT user_id, colour, date_trunc('day', created_at), count(*) FROM new_rows GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, colour, day) DO UPDATE SET count = thing_daily_count.count + excluded.count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER thing_daily_count_insert AFTER INSERT ON thing
+REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_thing_daily_count();
+CREATE TRIGGER thing_daily_count_update AFTER UPDATE ON thing
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_thing_daily_count();
+CREATE TRIGGER thing_daily_count_delete AFTER DELETE ON thing
+REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_thing_daily_count();
+"""
+db.event.listen(db.metadata, "after_create", db.DDL(thing_daily_count_triggers).execute_if(dialect="postgresql"))
+
+
+def normalise_email_address(email_address):
+    return email_address.lower().strip()
+
+
+def dialect_insert(model):
+    """Make an INSERT statement that supports ON CONFLICT, for PostgreSQL or SQLite."""
+    return (postgresql.insert if db.engine.dialect.name == "postgresql" else sqlite.insert)(model)
+
+
+def insert_ignoring_conflicts(model, **values):
+    """Make an INSERT ... ON CONFLICT DO NOTHING statement."""
+    return dialect_insert(model).values(**values).on_conflict_do_nothing()
+
+
+def delete_things(condition):
+    """Delete the Things matching a condition, leaving a tombstone and publishing an event for each.
+
+    Tombstones older than TOMBSTONE_RETENTION days are deleted at the same time.
+    """
+    now = datetime.utcnow()
+    deleted = db.session.execute(delete(Thing).where(condition).returning(Thing.id, Thing.user_id)).all()
+    if deleted:
+        tombstones = [{"id": id, "user_id": user_id, "deleted_at": now} for id, user_id in deleted]
+        db.session.execute(insert(ThingTombstone), tombstones)
+        for tombstone in tombstones:
+            events.publish(db.session, "deleted", tombstone)
+
+        horizon = tombstone_horizon(now)
+        if horizon is not None:
+            db.session.execute(delete(ThingTombstone).where(ThingTombstone.deleted_at < horizon))
+    return len(deleted)
+
+
+def tombstone_horizon(now=None):
+    """Get the time before which tombstones aren't kept, or None if they're kept forever."""
+    retention = current_app.config["TOMBSTONE_RETENTION"]
+    return (now or datetime.utcnow()) - timedelta(days=retention) if retention > 0 else None
+
+
+def owned_by(model, user_id):
+    """Query for instances of a model owned by a User."""
+    return model.query.filter(model.user_id == user_id)
+
+
+def get_owned_or_404(model, id, user_id):
+    """Get an instance of a model owned by a User.
+
+    Raises NotFound if there's no instance with the ID, or Forbidden if it's owned by
+    another User. The usual case is a single query filtered by both ID and owner, and
+    only a miss needs a second query to tell the two apart.
+    """
+    instance = owned_by(model, user_id).filter(model.id == id).one_or_none()
+    if instance is None:
+        if db.session.query(model.query.filter(model.id == id).exists()).scalar():
+            raise Forbidden
+        raise NotFound
+    return instance
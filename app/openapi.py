@@ -0,0 +1,39 @@
+import json
+import os
+
+from jsonschema import Draft202012Validator, FormatChecker
+from referencing import Registry, Resource
+from referencing.jsonschema import DRAFT202012
+
+from app.conditional import make_etag
+from app.export import ARROW_STREAM, EXPORT_TYPES, PARQUET
+
+# OpenAPI document, loaded once per process (or once in the master process when preloaded) from the
+# project root rather than the working directory
+with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "openapi.json")) as json_file:
+    spec = json.load(json_file)
+
+# Arrow and Parquet exports need pyarrow, so they're left out of the document when it isn't installed
+for path in spec["paths"].values():
+    for operation in path.values():
+        for response in operation.get("responses", {}).values():
+            for content_type in (ARROW_STREAM, PARQUET):
+                if content_type not in EXPORT_TYPES:
+                    response.get("content", {}).pop(content_type, None)
+
+# Serialised once, to be served as is
+document = json.dumps(spec, separators=(",", ":")).encode("UTF-8")
+document_etag = make_etag(document.decode("UTF-8"))
+
+# A compiled JSON schema validator for each schema in the components, resolving
+# references against the whole document
+registry = Registry().with_resource("urn:openapi", Resource(spec, specification=DRAFT202012))
+format_checker = FormatChecker()
+validators = {
+    name: Draft202012Validator(
+        {"$ref": f"urn:openapi#/components/schemas/{name}"},
+        registry=registry,
+        format_checker=format_checker,
+    )
+    for name in spec["components"]["schemas"]
+}
@@ -0,0 +1,91 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+
+from flask import current_app, request, url_for
+from sqlalchemy import DateTime, and_, or_, tuple_
+from werkzeug.exceptions import BadRequest
+
+
+def page_limit():
+    """Get the requested page size, bounded by the configured maximum."""
+    limit = request.args.get("limit", default=current_app.config["PAGE_SIZE"], type=int)
+    max_limit = current_app.config["MAX_PAGE_SIZE"]
+    if limit < 1 or limit > max_limit:
+        raise BadRequest(f"Limit must be between 1 and {max_limit}")
+    return limit
+
+
+def encode_cursor(value, id):
+    """Encode the sort value and ID of the last item on a page as an opaque cursor."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    data = json.dumps([value, id], separators=(",", ":")).encode("UTF-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, sort_column):
+    """Decode a cursor back into the sort value and ID it was created from.
+
+    Clients can send anything as a cursor, so the value must be of the sort column's
+    type, or NULL if the column is nullable, and the ID a UUID before either is used
+    in a query, where a mismatched type would be a database error.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, id = json.loads(data)
+        if value is None:
+            if not sort_column.nullable:
+                raise ValueError("Cursor value can't be NULL")
+        elif isinstance(sort_column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif type(value) is not sort_column.type.python_type:
+            raise TypeError("Cursor value must be of the sort column's type")
+        id = str(uuid.UUID(id))
+    except (AttributeError, binascii.Error, TypeError, ValueError):
+        raise BadRequest("Invalid cursor")
+    return value, id
+
+
+def paginate(query, sort_column, id_column, limit, cursor=None):
+    """Get one page of a query using keyset pagination.
+
+    Items are ordered by the sort column with the ID as a tiebreaker, and the cursor
+    marks the last item of the previous page. Each page is a bounded index range scan
+    so costs the same however deep into the results it is, unlike OFFSET paging.
+
+    Returns the items on the page and the cursor for the next page, if there is one.
+    """
+    if cursor:
+        value, id = decode_cursor(cursor, sort_column)
+        query = query.filter(_after(sort_column, id_column, value, id))
+
+    order = sort_column.asc().nulls_last() if sort_column.nullable else sort_column.asc()
+    items = query.order_by(order, id_column.asc()).limit(limit + 1).all()
+
+    if len(items) > limit:
+        last = items[limit - 1]
+        return items[:limit], encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return items, None
+
+
+def _after(sort_column, id_column, value, id):
+    if not sort_column.nullable:
+        return tuple_(sort_column, id_column) > (value, id)
+    # NULLs are ordered last, so they come after every non-NULL value
+    if value is None:
+        return and_(sort_column.is_(None), id_column > id)
+    return or_(tuple_(sort_column, id_column) > (value, id), sort_column.is_(None))
+
+
+def set_pagination_headers(response, next_cursor, limit):
+    """Add a Link header and X-Next-Cursor header pointing at the next page."""
+    if next_cursor:
+        args = request.args.to_dict()
+        args.update(cursor=next_cursor, limit=limit)
+        next_url = url_for(request.endpoint, _external=True, **args)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
@@ -0,0 +1,106 @@
+from time import perf_counter
+from weakref import WeakSet
+
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from werkzeug.exceptions import ServiceUnavailable
+
+from app.instrumentation import LATENCY_BUCKETS, record
+from app.metrics import Gauge, Histogram
+
+# PostgreSQL's error code for a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+
+pools = WeakSet()
+
+checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a database connection", buckets=LATENCY_BUCKETS
+)
+pool_gauges = (
+    Gauge("db_pool_size", "Connections each pool keeps open", lambda: sum(pool.size() for pool in list(pools))),
+    Gauge(
+        "db_pool_in_use", "Connections checked out of the pools", lambda: sum(pool.checkedout() for pool in list(pools))
+    ),
+    Gauge(
+        "db_pool_overflow",
+        "Connections open beyond the pool size",
+        lambda: sum(max(pool.overflow(), 0) for pool in list(pools)),
+    ),
+)
+
+
+class InstrumentedPool(QueuePool):
+    """A QueuePool that records how long each checkout waits for a connection, and the connections in use."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pools.add(self)
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            seconds = perf_counter() - start
+            checkout_wait.observe(seconds)
+            record("pool", seconds)
+            refresh_pool_gauges()
+
+    def _do_return_conn(self, connection_record):
+        super()._do_return_conn(connection_record)
+        refresh_pool_gauges()
+
+
+def refresh_pool_gauges():
+    for gauge in pool_gauges:
+        gauge.refresh()
+
+
+def set_statement_timeout(connection, milliseconds):
+    """Change the statement timeout for the rest of a connection's transaction, where zero is no timeout.
+
+    Only PostgreSQL connections have a statement timeout, so others are left alone.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text("SELECT set_config('statement_timeout', :timeout, true)"), {"timeout": str(milliseconds)}
+        )
+
+
+class DatabasePool(object):
+    """Configures the connection pools of every engine, and sheds load when they're exhausted.
+
+    Each engine gets an instrumented pool sized by the DATABASE_POOL_* settings, and on
+    PostgreSQL a statement_timeout of DATABASE_STATEMENT_TIMEOUT milliseconds, which
+    exports and batches change for their own transactions. A request that waits
+    longer than DATABASE_POOL_TIMEOUT for a connection, or whose statement times out,
+    gets a 503 with Retry-After rather than a 500.
+    """
+
+    def init_app(self, app):
+        options = {"poolclass": InstrumentedPool, **app.config["SQLALCHEMY_ENGINE_OPTIONS"]}
+        timeout = app.config["DATABASE_STATEMENT_TIMEOUT"]
+        if timeout and app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+            connect_args = options.get("connect_args", {})
+            options["connect_args"] = {**connect_args, "options": f"-c statement_timeout={timeout}"}
+
+        # Must be done before the SQLAlchemy extension creates the engines
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+        app.register_error_handler(PoolTimeoutError, self._unavailable)
+        app.register_error_handler(OperationalError, self._operational_error)
+
+    def _unavailable(self, error):
+        current_app.logger.warning(f"Database unavailable: {error}")
+        return current_app.handle_http_exception(
+            ServiceUnavailable(
+                "The database is busy, try again later", retry_after=current_app.config["ADMISSION_RETRY_AFTER"]
+            )
+        )
+
+    def _operational_error(self, error):
+        if getattr(error.orig, "pgcode", None) == QUERY_CANCELED:
+            return self._unavailable(error)
+        raise error
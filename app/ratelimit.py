@@ -0,0 +1,176 @@
+from threading import Lock, RLock, Thread
+from time import sleep, time
+
+import jwt
+import redis
+from flask import current_app, request
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage, storage_from_string
+
+
+def rate_limit_key():
+    """Key rate limits by the authenticated principal, or the client address if there isn't one.
+
+    Bearer tokens are verified, but decoded without looking up the User. Basic
+    credentials haven't been verified when the limit is checked, so a made up email
+    address mustn't get a limit of its own. They're only used when requesting a
+    token, keyed by client address and email address, so guessing one account's
+    password is limited without sharing the limit with everyone behind the address.
+    """
+    authorization = request.authorization
+    if authorization is not None:
+        if authorization.type == "bearer" and authorization.token:
+            try:
+                claims = jwt.decode(authorization.token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
+                return f"user:{claims['sub']}"
+            except (jwt.PyJWTError, KeyError):
+                pass
+        elif authorization.type == "basic" and authorization.username and request.endpoint == "auth.get_token":
+            return f"email:{get_remote_address()}:{authorization.username.lower().strip()}"
+    return get_remote_address()
+
+
+def rate_limit_tier():
+    """Get the limit for the current request: RATELIMIT_TOKEN, RATELIMIT_WRITE or RATELIMIT_READ."""
+    if request.endpoint == "auth.get_token":
+        return current_app.config["RATELIMIT_TOKEN"]
+    if request.method in ("POST", "PUT", "PATCH", "DELETE"):
+        return current_app.config["RATELIMIT_WRITE"]
+    return current_app.config["RATELIMIT_READ"]
+
+
+def after_fork(storage):
+    """Drop the Redis connections and sync state a rate limit storage inherited from the parent process."""
+    if isinstance(storage, HybridStorage):
+        storage.after_fork()
+        storage = storage.shared
+    client = getattr(storage, "storage", None)
+    if isinstance(client, redis.Redis):
+        client.connection_pool.reset()
+
+
+class _Window(object):
+    __slots__ = ("shared", "unsynced", "expires", "expiry")
+
+    def __init__(self, expiry):
+        self.shared = 0
+        self.unsynced = 0
+        self.expires = time() + expiry
+        self.expiry = expiry
+
+
+class HybridStorage(Storage):
+    """Rate limit counters kept in process, and added to a shared storage in batches.
+
+    Used for hybrid+ storage URIs, such as hybrid+redis://localhost:6379, where the
+    rest of the URI is the shared storage. hybrid+memory:// shares in process only,
+    standing in for Redis locally.
+
+    Hits are checked against the local count, which is every process's hits as of
+    the last sync plus this process's since. A background thread adds the unsynced
+    hits to the shared counters every sync_interval seconds, and a request syncs
+    straight away once a key has sync_batch unsynced hits. So a limit can be
+    exceeded by up to sync_batch hits per process, in return for most requests
+    not waiting on Redis. Smaller values are more accurate, and a batch of 1 syncs
+    every hit.
+    """
+
+    STORAGE_SCHEME = ["hybrid+redis", "hybrid+rediss", "hybrid+redis+unix", "hybrid+memory"]
+
+    def __init__(self, uri, sync_interval=1, sync_batch=10, **options):
+        super().__init__(uri, **options)
+        self.shared = storage_from_string(uri.split("+", 1)[1], **options)
+        self.sync_interval = float(sync_interval)
+        self.sync_batch = int(sync_batch)
+        self._windows = {}
+        self._syncer = None
+        self._syncer_lock = Lock()
+
+    def after_fork(self):
+        self.lock = RLock()
+        self._windows = {}
+        self._syncer = None
+        self._syncer_lock = Lock()
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        self._start_syncer()
+        with self.lock:
+            window = self._window(key)
+            if window is None:
+                window = self._windows[key] = _Window(expiry)
+            window.unsynced += amount
+            count = window.shared + window.unsynced
+            if window.unsynced < self.sync_batch:
+                return count
+        return self.sync(key)
+
+    def get(self, key):
+        with self.lock:
+            window = self._window(key)
+            return window.shared + window.unsynced if window else 0
+
+    def get_expiry(self, key):
+        with self.lock:
+            window = self._window(key)
+            return int(window.expires if window else time())
+
+    def check(self):
+        return self.shared.check()
+
+    def reset(self):
+        with self.lock:
+            self._windows.clear()
+        return self.shared.reset()
+
+    def clear(self, key):
+        with self.lock:
+            self._windows.pop(key, None)
+        self.shared.clear(key)
+
+    def sync(self, key):
+        """Add a key's unsynced hits to the shared counter, and return the new total."""
+        with self.lock:
+            window = self._window(key)
+            if window is None:
+                return 0
+            amount, window.unsynced = window.unsynced, 0
+
+        try:
+            shared = self.shared.incr(key, window.expiry, amount=amount) if amount else self.shared.get(key)
+            expires = self.shared.get_expiry(key)
+        except Exception:
+            # Keep counting locally until the shared storage is back
+            with self.lock:
+                window.unsynced += amount
+                return window.shared + window.unsynced
+
+        with self.lock:
+            window.shared = shared
+            window.expires = expires
+            return window.shared + window.unsynced
+
+    def _window(self, key):
+        window = self._windows.get(key)
+        if window is not None and window.expires <= time():
+            del self._windows[key]
+            return None
+        return window
+
+    def _start_syncer(self):
+        if self._syncer is not None and self._syncer.is_alive():
+            return
+        with self._syncer_lock:
+            if self._syncer is None or not self._syncer.is_alive():
+                self._syncer = Thread(target=self._sync_periodically, name="ratelimit-sync", daemon=True)
+                self._syncer.start()
+
+    def _sync_periodically(self):
+        while True:
+            sleep(self.sync_interval)
+            with self.lock:
+                keys = [key for key, window in self._windows.items() if window.unsynced]
+                expired = [key for key, window in self._windows.items() if window.expires <= time()]
+                for key in expired:
+                    del self._windows[key]
+            for key in keys:
+                self.sync(key)
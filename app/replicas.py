@@ -0,0 +1,126 @@
+from itertools import cycle
+from threading import Lock
+from time import monotonic
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.dml import UpdateBase
+
+# Seconds since the last replayed transaction, or zero if everything received has been replayed, as
+# the last transaction gets older while the primary is idle. NULL if this isn't actually a replica.
+LAG = text(
+    """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class Replicas(object):
+    """Round-robin choice of healthy read replicas.
+
+    Each replica URI in SQLALCHEMY_REPLICA_URIS is added to SQLALCHEMY_BINDS, so has
+    an engine with the same options as the primary, and on PostgreSQL gives up
+    connecting after REPLICA_CONNECT_TIMEOUT seconds. A replica is health checked at
+    most every REPLICA_CHECK_INTERVAL seconds, by one request while the others use
+    the last result, and is skipped if it can't be reached or, on PostgreSQL, if it
+    has WAL left to replay from more than REPLICA_MAX_LAG seconds ago.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.max_lag = 0
+        self.check_interval = 0
+        self.connect_timeout = 0
+        self._cycle = cycle(())
+        self._health = {}
+        self._lock = Lock()
+
+    def init_app(self, app):
+        uris = app.config["SQLALCHEMY_REPLICA_URIS"]
+        self.keys = [f"replica_{i}" for i in range(len(uris))]
+        self.max_lag = app.config["REPLICA_MAX_LAG"]
+        self.check_interval = app.config["REPLICA_CHECK_INTERVAL"]
+        self.connect_timeout = app.config["REPLICA_CONNECT_TIMEOUT"]
+        self._cycle = cycle(self.keys)
+        self._health = {}
+
+        # Must be done before the SQLAlchemy extension creates the engines, and after the
+        # pool options are set, as binds don't get SQLALCHEMY_ENGINE_OPTIONS otherwise
+        binds = {key: self._engine_options(app, uri) for key, uri in zip(self.keys, uris)}
+        app.config["SQLALCHEMY_BINDS"] = {**app.config.get("SQLALCHEMY_BINDS", {}), **binds}
+        app.extensions["replicas"] = self
+
+    def _engine_options(self, app, uri):
+        options = {**app.config["SQLALCHEMY_ENGINE_OPTIONS"], "url": uri}
+        if self.connect_timeout and uri.startswith("postgresql"):
+            options["connect_args"] = {**options.get("connect_args", {}), "connect_timeout": self.connect_timeout}
+        return options
+
+    def engine(self):
+        """Get the engine for the next healthy replica, or None if there isn't one."""
+        for _ in self.keys:
+            with self._lock:
+                key = next(self._cycle)
+            if self.is_healthy(key):
+                return current_app.extensions["sqlalchemy"].engines[key]
+        return None
+
+    def is_healthy(self, key):
+        with self._lock:
+            healthy, checked_at = self._health.get(key, (False, None))
+            due = checked_at is None or monotonic() - checked_at >= self.check_interval
+            if due:
+                # Claim the check, so other requests use the last result rather than waiting on it too
+                self._health[key] = (healthy, monotonic())
+        if due:
+            healthy = self.check(key)
+            with self._lock:
+                self._health[key] = (healthy, monotonic())
+        return healthy
+
+    def check(self, key):
+        engine = current_app.extensions["sqlalchemy"].engines[key]
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name == "postgresql":
+                    lag = connection.execute(LAG).scalar()
+                else:
+                    lag = connection.execute(text("SELECT 0")).scalar()
+        except SQLAlchemyError:
+            current_app.logger.warning(f"Replica {key} is unavailable", exc_info=True)
+            return False
+
+        if lag is not None and lag > self.max_lag:
+            current_app.logger.warning(f"Replica {key} is {lag:.1f} seconds behind")
+            return False
+        return True
+
+
+class RoutingSession(Session):
+    """A session that sends reads in GET requests to a replica, and everything else to the primary.
+
+    Every read in a session goes to the same replica, so they see the same point in
+    its replay. Once a session has written anything, it stays on the primary until
+    it's removed at the end of the request, so reads after a write see that write.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and "replicas" in current_app.extensions:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info["primary"] = True
+            elif self._can_read_replica():
+                if "replica" not in self.info:
+                    self.info["replica"] = current_app.extensions["replicas"].engine()
+                if self.info["replica"] is not None:
+                    return self.info["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _can_read_replica(self):
+        if self.info.get("primary") or not current_app.extensions["replicas"].keys:
+            return False
+        return has_request_context() and request.method in ("GET", "HEAD")
@@ -0,0 +1,33 @@
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+
+
+def contains(column, text):
+    """Filter for a column containing some text, ignoring case.
+
+    On PostgreSQL a leading wildcard match like this can be served by a pg_trgm GIN
+    index on the column, rather than a sequential scan. Other databases, such as
+    SQLite, fall back to scanning.
+    """
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.ilike(f"%{escaped}%", escape="\\")
+
+
+def matches(column, text):
+    """Filter for a column containing every word in some text, using full-text search.
+
+    Needs a GIN index on to_tsvector('simple', column) to be fast, and falls back to
+    a substring match on databases other than PostgreSQL.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return contains(column, text)
+    return func.to_tsvector("simple", column).op("@@")(func.plainto_tsquery("simple", text))
+
+
+def search(column, text):
+    """Filter for a column matching some text, using the configured SEARCH_MODE."""
+    if current_app.config["SEARCH_MODE"] == "fulltext":
+        return matches(column, text)
+    return contains(column, text)
@@ -0,0 +1,86 @@
+import json
+from datetime import datetime
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+
+# Functions to encode a value as UTF-8 JSON bytes and decode it again, for each installed library.
+# Each gives the same output, with datetimes in ISO 8601 format and UUIDs as strings, except that
+# msgspec writes the UTC offset of aware datetimes as Z rather than +00:00.
+backends = {"json": (lambda value: _encoder.encode(value).encode("UTF-8"), json.loads)}
+if orjson:
+    backends["orjson"] = (orjson.dumps, orjson.loads)
+if msgspec:
+
+    def _msgspec_loads(data):
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    backends["msgspec"] = (msgspec.json.Encoder().encode, _msgspec_loads)
+
+
+def parse_datetime(value):
+    """Parse an ISO 8601 datetime written by any of the backends.
+
+    datetime.fromisoformat only reads a Z offset from Python 3.11.
+    """
+    return datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+
+
+class Serialiser(object):
+    """Serialises values to compact JSON with the library named by JSON_SERIALISER.
+
+    The default of "auto" uses orjson or msgspec if either is installed, and the
+    standard library otherwise.
+    """
+
+    def __init__(self):
+        self.use("auto")
+
+    def init_app(self, app):
+        self.use(app.config["JSON_SERIALISER"])
+
+    def use(self, name):
+        if name == "auto":
+            name = next(name for name in ("orjson", "msgspec", "json") if name in backends)
+        if name not in backends:
+            raise ValueError(f"JSON serialiser {name} isn't installed")
+        self.name = name
+        self._dumps, self._loads = backends[name]
+
+    def dumps(self, value):
+        """Serialise a value to JSON bytes."""
+        return self._dumps(value)
+
+    def loads(self, data):
+        """Deserialise JSON text or bytes, raising ValueError if it isn't valid."""
+        return self._loads(data)
+
+    def dump_rows(self, keys, rows):
+        """Serialise row tuples, such as those from a column query, to a JSON array of objects.
+
+        Each row is zipped with the keys as it's encoded, so rows can have extra trailing
+        columns (like a sort column) that aren't included.
+        """
+        return self._dumps([dict(zip(keys, row)) for row in rows])
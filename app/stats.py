@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import func
+
+from app import db
+
+# Periods that creation times can be grouped into
+periods = ("day", "week", "month")
+
+
+def period_start(period, column):
+    """Get the start of the day, week (from Monday) or month a timestamp column falls in.
+
+    Uses date_trunc on PostgreSQL, and SQLite date functions elsewhere.
+    """
+    if db.engine.dialect.name == "postgresql":
+        return func.date_trunc(period, column)
+    if period == "day":
+        return func.date(column)
+    if period == "week":
+        return func.date(column, "-6 days", "weekday 1")
+    return func.date(column, "start of month")
+
+
+def count_groups(query, key, count):
+    """Count a query's rows grouped by a key, in key order.
+
+    Returns the total and a list of groups, each with the key value and count. Dates
+    are given without a time.
+    """
+    rows = query.with_entities(key, count).group_by(key).having(count > 0).order_by(key).all()
+    groups = [
+        {"value": value.date().isoformat() if isinstance(value, datetime) else value, "count": int(n)}
+        for value, n in rows
+    ]
+    return sum(group["count"] for group in groups), groups
@@ -1,24 +1,45 @@
-import csv
-import json
-from datetime import datetime
-from io import StringIO
+import uuid
+from datetime import datetime, timezone
 
-from flask import Response, request, url_for
+from flask import Response, abort, current_app, request, url_for
 from flask_httpauth import HTTPTokenAuth
 from flask_negotiate import consumes, produces
-from jsonschema import FormatChecker, ValidationError, validate
-from werkzeug.exceptions import BadRequest, Forbidden
-
-from app import db
-from app.models import Thing, User
+from jsonschema import ValidationError
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.orm import load_only
+from werkzeug.exceptions import BadRequest, Gone
+
+from app import db, events, serialiser
+from app.cached_lists import cached_list, table_version
+from app.conditional import collection_version, make_etag, not_modified, not_modified_response, set_validators
+from app.export import EXPORT_TYPES, export_response, generate_csv, stream_rows
+from app.fields import field_columns, requested_fields
+from app.idempotency import idempotent
+from app.instrumentation import timed
+from app.models import Thing, ThingDailyCount, ThingTombstone, User, delete_things, get_owned_or_404, tombstone_horizon
+from app.openapi import validators
+from app.pagination import page_limit, paginate, set_pagination_headers
+from app.pool import set_statement_timeout
+from app.search import search
+from app.stats import count_groups, period_start, periods
 from app.thing import bp
 
 auth = HTTPTokenAuth(scheme="Bearer")
 
-# JSON schema for thing requests
-with open("openapi.json") as json_file:
-    openapi = json.load(json_file)
-thing_schema = openapi["components"]["schemas"]["ThingRequest"]
+# JSON schema validators for thing requests
+thing_validator = validators["ThingRequest"]
+batch_validator = validators["ThingBatchOperation"]
+
+# Attributes that things can be sorted on
+sortable = ("name", "colour", "created_at", "updated_at")
+
+# What things can be counted by at /stats
+stats_groups = ("colour", "user_id", *periods)
+
+# Attributes that can be requested with the fields parameter, and those included in lists by default
+fields = ("id", "name", "colour", "user_id", "created_at", "updated_at")
+list_fields = ("id", "name", "colour")
+csv_fields = ("id", "name", "colour", "created_at", "updated_at")
 
 
 @auth.verify_token
@@ -29,90 +50,200 @@ def authenticate(token):
 @auth.error_handler
 def auth_error(status):
     return Response(
-        response=json.dumps(
-            {"code": status, "name": "Unauthorised"},
-            separators=(",", ":"),
-        ),
+        response=serialiser.dumps({"code": status, "name": "Unauthorised"}),
         mimetype="application/json",
         status=status,
     )
 
 
+def sort_column():
+    """Get the Thing column to sort on from the query string."""
+    sort_by = request.args.get("sort", default="name", type=str)
+    if sort_by not in sortable:
+        raise BadRequest(f"Sort must be one of {', '.join(sortable)}")
+    return getattr(Thing, sort_by)
+
+
+def since_arg(name):
+    """Get a date and time from the query string as naive UTC, like the stored timestamps."""
+    value = request.args.get(name, type=str)
+    if not value:
+        return None
+    try:
+        since = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise BadRequest(f"{name.replace('_', ' ').capitalize()} must be an ISO 8601 date and time")
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def filter_things(query):
+    """Apply the name, colour and updated_since filters from the query string to a query."""
+    name_query = request.args.get("name", type=str)
+    colour_filter = request.args.get("colour", type=str)
+    updated_since = since_arg("updated_since")
+
+    if name_query:
+        query = query.filter(search(Thing.name, name_query))
+    if colour_filter:
+        query = query.filter(Thing.colour == colour_filter)
+    if updated_since:
+        # Each side of the OR can use its own timestamp index
+        query = query.filter(or_(Thing.created_at >= updated_since, Thing.updated_at >= updated_since))
+    return query
+
+
 @bp.route("", methods=["GET"])
 @produces("application/json", "text/csv")
 @auth.login_required
+@cached_list("thing")
 def list_things():
     """Get a list of Things."""
-    sort_by = request.args.get("sort", type=str)
-    name_query = request.args.get("name", type=str)
-    colour_filter = request.args.get("colour", type=str)
+    cursor = request.args.get("cursor", type=str)
+    limit = page_limit()
 
-    query = Thing.query
+    sort = sort_column()
+    default_fields = list_fields if "application/json" in request.headers.getlist("accept") else csv_fields
+    selected = requested_fields(fields, default_fields)
 
-    if name_query:
-        query = query.filter(Thing.name.ilike(f"%{name_query}%"))
-    if colour_filter:
-        query = query.filter(Thing.colour == colour_filter)
-    if sort_by and sort_by != "name":
-        query = query.order_by(getattr(Thing, sort_by).asc(), Thing.name.asc())
-    else:
-        query = query.order_by(Thing.name.asc())
+    # Rows of only the selected columns, and those needed for paging, rather than Thing entities
+    query = filter_things(db.session.query(*field_columns(Thing, selected, sort, Thing.id)))
+
+    etag, last_modified = collection_version(*table_version("thing"))
+    if not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
 
-    things = query.all()
+    things, next_cursor = paginate(query, sort, Thing.id, limit, cursor)
 
     if things:
         if "application/json" in request.headers.getlist("accept"):
-            results = [thing.list_item() for thing in things]
+            with timed("serialise"):
+                body = serialiser.dump_rows(selected, things)
 
-            return Response(
-                json.dumps(results, separators=(",", ":")),
-                mimetype="application/json",
+            response = Response(body, mimetype="application/json", status=200)
+            return set_validators(set_pagination_headers(response, next_cursor, limit), etag, last_modified)
+        elif "text/csv" in request.headers.getlist("accept"):
+            # Write the page as one chunk, rather than a chunk per row
+            response = Response(
+                generate_csv([[row[: len(selected)] for row in things]], [field.upper() for field in selected]),
+                mimetype="text/csv",
                 status=200,
             )
-        elif "text/csv" in request.headers.getlist("accept"):
-
-            def generate():
-                data = StringIO()
-                w = csv.writer(data)
-
-                # write header
-                w.writerow(("ID", "NAME", "COLOUR", "CREATED_AT", "UPDATED_AT"))
-                yield data.getvalue()
-                data.seek(0)
-                data.truncate(0)
-
-                # write each item
-                for thing in things:
-                    w.writerow(
-                        (
-                            thing.id,
-                            thing.name,
-                            thing.colour,
-                            thing.created_at.isoformat(),
-                            thing.updated_at.isoformat() if thing.updated_at else None,
-                        )
-                    )
-                    yield data.getvalue()
-                    data.seek(0)
-                    data.truncate(0)
-
-            response = Response(generate(), mimetype="text/csv", status=200)
             response.headers.set("Content-Disposition", "attachment", filename="things.csv")
-            return response
+            return set_validators(set_pagination_headers(response, next_cursor, limit), etag, last_modified)
+    else:
+        return set_validators(Response(mimetype="application/json", status=204), etag, last_modified)
+
+
+@bp.route("/export", methods=["GET"])
+@produces(*EXPORT_TYPES)
+@auth.login_required
+def export_things():
+    """Stream every Thing as JSON, CSV, NDJSON, Arrow or Parquet."""
+    columns = (Thing.id, Thing.name, Thing.colour, Thing.created_at, Thing.updated_at)
+    statement = filter_things(select(*columns)).order_by(sort_column(), Thing.id)
+    chunks = stream_rows(
+        db.session.get_bind(clause=statement),
+        statement,
+        current_app.config["EXPORT_CHUNK_SIZE"],
+        current_app.config["EXPORT_STATEMENT_TIMEOUT"],
+    )
+
+    return export_response(chunks, columns, "things")
+
+
+@bp.route("/deleted", methods=["GET"])
+@produces("application/json")
+@auth.login_required
+def list_deleted_things():
+    """Get a list of deleted Things, so clients can remove their copies."""
+    limit = page_limit()
+    query = db.session.query(ThingTombstone.id, ThingTombstone.user_id, ThingTombstone.deleted_at)
+    deleted_since = since_arg("deleted_since")
+    if deleted_since:
+        horizon = tombstone_horizon()
+        if horizon is not None and deleted_since < horizon:
+            raise Gone(
+                f"Deleted Things are only kept for {current_app.config['TOMBSTONE_RETENTION']} days, "
+                "so get every Thing again instead"
+            )
+        query = query.filter(ThingTombstone.deleted_at >= deleted_since)
+
+    tombstones, next_cursor = paginate(
+        query, ThingTombstone.deleted_at, ThingTombstone.id, limit, request.args.get("cursor", type=str)
+    )
+
+    if tombstones:
+        with timed("serialise"):
+            body = serialiser.dump_rows(("id", "user_id", "deleted_at"), tombstones)
+        return set_pagination_headers(Response(body, mimetype="application/json", status=200), next_cursor, limit)
     else:
         return Response(mimetype="application/json", status=204)
 
 
+@bp.route("/events", methods=["GET"])
+@produces("text/event-stream")
+@auth.login_required
+def thing_events():
+    """Stream created, updated and deleted events for Things as Server-Sent Events."""
+    # A sync worker can only serve one request at a time, and is killed by gunicorn's timeout
+    if not request.environ.get("wsgi.multithread"):
+        abort(501, "Event streams need a threaded or ASGI server")
+    subscription = events.subscribe()
+
+    def generate():
+        # Comments send the headers straight away, keep the connection open through proxies and find closed ones
+        yield b": connected\n\n"
+        for message in events.receive(subscription):
+            yield message or b": heartbeat\n\n"
+
+    response = Response(generate(), mimetype="text/event-stream", status=200)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@bp.route("/stats", methods=["GET"])
+@produces("application/json")
+@auth.login_required
+def thing_stats():
+    """Count every Thing, not only the caller's, grouped by colour, owner or creation period."""
+    group_by = request.args.get("group_by", default="colour", type=str)
+    if group_by not in stats_groups:
+        raise BadRequest(f"Group by must be one of {', '.join(stats_groups)}")
+
+    # The summary table has no names or update times, so can't be used when filtering by them
+    if current_app.config["STATS_SUMMARY"] and not (request.args.get("name") or request.args.get("updated_since")):
+        query = ThingDailyCount.query
+        if request.args.get("colour"):
+            query = query.filter(ThingDailyCount.colour == request.args["colour"])
+        model, count, created = ThingDailyCount, func.sum(ThingDailyCount.count), ThingDailyCount.day
+    else:
+        query = filter_things(Thing.query)
+        model, count, created = Thing, func.count(Thing.id), Thing.created_at
+
+    key = period_start(group_by, created) if group_by in periods else getattr(model, group_by)
+    total, groups = count_groups(query, key, count)
+
+    return Response(
+        serialiser.dumps({"group_by": group_by, "total": total, "groups": groups}),
+        mimetype="application/json",
+        status=200,
+    )
+
+
 @bp.route("", methods=["POST"])
 @consumes("application/json")
 @produces("application/json")
 @auth.login_required
+@idempotent
 def create_thing():
     """Create a new Thing."""
 
     # Validate request against schema
     try:
-        validate(request.json, thing_schema, format_checker=FormatChecker())
+        thing_validator.validate(request.json)
     except ValidationError as e:
         raise BadRequest(e.message)
 
@@ -123,6 +254,7 @@ def create_thing():
     )
 
     db.session.add(thing)
+    events.publish(db.session, "created", thing.as_dict())
     db.session.commit()
 
     response = Response(repr(thing), mimetype="application/json", status=201)
@@ -136,9 +268,21 @@ def create_thing():
 @auth.login_required
 def get_thing(thing_id):
     """Get a Thing with a specific ID."""
-    thing = Thing.query.get_or_404(str(thing_id))
+    selected = requested_fields(fields, None)
+    query = Thing.query
+    if selected:
+        # Load the selected columns, and those the ETag and Last-Modified headers are made from
+        query = query.options(load_only(*field_columns(Thing, selected, Thing.created_at, Thing.updated_at)))
+    thing = query.get_or_404(str(thing_id))
 
-    return Response(repr(thing), mimetype="application/json", status=200)
+    # Each selection of fields is a different representation, so needs its own ETag
+    etag = make_etag(thing.etag, *selected) if selected else thing.etag
+    if not_modified(etag, thing.last_modified):
+        return not_modified_response(etag, thing.last_modified)
+
+    body = serialiser.dumps({field: getattr(thing, field) for field in selected}) if selected else repr(thing)
+    response = Response(body, mimetype="application/json", status=200)
+    return set_validators(response, etag, thing.last_modified)
 
 
 @bp.route("/<uuid:thing_id>", methods=["PUT"])
@@ -147,22 +291,20 @@ def get_thing(thing_id):
 @auth.login_required
 def update_thing(thing_id):
     """Update a Thing with a specific ID."""
-    if str(thing_id) not in [thing.id for thing in auth.current_user().things]:
-        raise Forbidden
+    thing = get_owned_or_404(Thing, str(thing_id), auth.current_user().id)
 
     # Validate request against schema
     try:
-        validate(request.json, thing_schema, format_checker=FormatChecker())
+        thing_validator.validate(request.json)
     except ValidationError as e:
         raise BadRequest(e.message)
 
-    thing = Thing.query.get_or_404(str(thing_id))
-
     thing.name = request.json["name"].title().strip()
     thing.colour = request.json["colour"].strip()
     thing.updated_at = datetime.utcnow()
 
     db.session.add(thing)
+    events.publish(db.session, "updated", thing.as_dict())
     db.session.commit()
 
     return Response(repr(thing), mimetype="application/json", status=200)
@@ -173,12 +315,139 @@ def update_thing(thing_id):
 @auth.login_required
 def delete_thing(thing_id):
     """Delete a Thing with a specific ID."""
-    if str(thing_id) not in [thing.id for thing in auth.current_user().things]:
-        raise Forbidden
-
-    thing = Thing.query.get_or_404(str(thing_id))
+    thing = get_owned_or_404(Thing, str(thing_id), auth.current_user().id)
 
-    db.session.delete(thing)
+    delete_things(Thing.id == thing.id)
     db.session.commit()
 
     return Response(mimetype="application/json", status=204)
+
+
+@bp.route("/batch", methods=["POST"])
+@consumes("application/json", "application/x-ndjson")
+@produces("application/json")
+@auth.login_required
+def batch_things():
+    """Create, update and delete Things in bulk."""
+    operations = read_operations()
+    chunk_size = current_app.config["BATCH_CHUNK_SIZE"] or len(operations) or 1
+    user_id = auth.current_user().id
+
+    results = []
+    for start in range(0, len(operations), chunk_size):
+        results += apply_operations(operations[start : start + chunk_size], user_id)
+
+    return Response(serialiser.dumps(results), mimetype="application/json", status=200)
+
+
+def read_operations():
+    """Read a JSON array or NDJSON stream of batch operations from the request."""
+    if request.mimetype == "application/x-ndjson":
+        try:
+            operations = [
+                serialiser.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()
+            ]
+        except ValueError:
+            raise BadRequest("Request body is not valid NDJSON")
+    else:
+        operations = request.json
+
+    if not isinstance(operations, list):
+        raise BadRequest("Request body must be an array of operations")
+    if len(operations) > current_app.config["BATCH_MAX_SIZE"]:
+        raise BadRequest(f"A batch can have at most {current_app.config['BATCH_MAX_SIZE']} operations")
+    return operations
+
+
+def apply_operations(operations, user_id):
+    """Apply a chunk of batch operations in a single transaction.
+
+    Valid creates are inserted with one multi-row INSERT, and updates and deletes
+    are checked for ownership with one query before being written set-based. An
+    invalid operation gets an error result without affecting the others.
+    """
+    now = datetime.utcnow()
+    set_statement_timeout(db.session.connection(), current_app.config["BATCH_STATEMENT_TIMEOUT"])
+    results, creates, updates, deletes = group_operations(operations, user_id, now)
+    check_ownership(results, updates, deletes, user_id)
+
+    if creates:
+        db.session.execute(insert(Thing), creates)
+        for thing in creates:
+            events.publish(db.session, "created", {**thing, "updated_at": None})
+    if updates:
+        db.session.execute(
+            update(Thing),
+            [
+                {"id": id, "name": data["name"].title().strip(), "colour": data["colour"].strip(), "updated_at": now}
+                for id, (i, data) in updates.items()
+            ],
+        )
+        columns = [getattr(Thing, field) for field in fields]
+        for thing in db.session.execute(select(*columns).where(Thing.id.in_(list(updates)))):
+            events.publish(db.session, "updated", dict(zip(fields, thing)))
+    if deletes:
+        delete_things(Thing.id.in_(list(deletes)))
+    db.session.commit()
+
+    return results
+
+
+def group_operations(operations, user_id, now):
+    """Validate batch operations and group them into creates, updates and deletes."""
+    results = [None] * len(operations)
+    creates, updates, deletes = [], {}, {}
+
+    for i, operation in enumerate(operations):
+        try:
+            batch_validator.validate(operation)
+        except ValidationError as e:
+            results[i] = {"status": 400, "description": e.message}
+            continue
+
+        if operation["op"] == "create":
+            id = str(uuid.uuid4())
+            creates.append(
+                {
+                    "id": id,
+                    "name": operation["data"]["name"].title().strip(),
+                    "colour": operation["data"]["colour"],
+                    "user_id": user_id,
+                    "created_at": now,
+                }
+            )
+            results[i] = {"status": 201, "id": id}
+            continue
+
+        id = str(uuid.UUID(operation["id"]))
+        if id in updates or id in deletes:
+            results[i] = {"status": 400, "id": id, "description": "Thing appears more than once in the batch"}
+        elif operation["op"] == "update":
+            updates[id] = (i, operation["data"])
+        else:
+            deletes[id] = i
+
+    return results, creates, updates, deletes
+
+
+def check_ownership(results, updates, deletes, user_id):
+    """Check every Thing being updated or deleted exists and is owned by the user, in one query.
+
+    Operations on Things that don't pass are removed and get an error result.
+    """
+    ids = list(updates) + list(deletes)
+    if not ids:
+        return
+    owners = dict(db.session.execute(select(Thing.id, Thing.user_id).where(Thing.id.in_(ids))).all())
+
+    for id in ids:
+        i = updates[id][0] if id in updates else deletes[id]
+        if id not in owners:
+            results[i] = {"status": 404, "id": id, "description": "Thing not found"}
+        elif owners[id] != user_id:
+            results[i] = {"status": 403, "id": id, "description": "Thing is owned by another user"}
+        else:
+            results[i] = {"status": 200 if id in updates else 204, "id": id}
+            continue
+        updates.pop(id, None)
+        deletes.pop(id, None)
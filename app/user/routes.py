@@ -1,24 +1,37 @@
-import csv
-import json
 from datetime import datetime
-from io import StringIO
 
-from flask import Response, request, url_for
+from flask import Response, current_app, request, url_for
 from flask_httpauth import HTTPTokenAuth
 from flask_negotiate import consumes, produces
-from jsonschema import FormatChecker, ValidationError, validate
+from jsonschema import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
 from werkzeug.exceptions import BadRequest, Forbidden
 
-from app import db
-from app.models import User
+from app import db, serialiser, token_cache
+from app.cached_lists import cached_list, table_version
+from app.conditional import collection_version, make_etag, not_modified, not_modified_response, set_validators
+from app.export import EXPORT_TYPES, export_response, generate_csv, stream_rows
+from app.fields import field_columns, requested_fields
+from app.idempotency import idempotent
+from app.instrumentation import timed
+from app.models import Thing, User, delete_things
+from app.openapi import validators
+from app.pagination import page_limit, paginate, set_pagination_headers
+from app.search import contains
 from app.user import bp
 
 auth = HTTPTokenAuth(scheme="Bearer")
 
-# JSON schema for user requests
-with open("openapi.json") as json_file:
-    openapi = json.load(json_file)
-user_schema = openapi["components"]["schemas"]["UserRequest"]
+# JSON schema validator for user requests
+user_validator = validators["UserRequest"]
+
+# Attributes that users can be sorted on
+sortable = ("email_address", "created_at", "updated_at")
+
+# Attributes that can be requested with the fields parameter, and those included in lists by default
+fields = ("id", "email_address", "created_at", "updated_at")
+list_fields = ("id", "email_address")
 
 
 @auth.verify_token
@@ -29,94 +42,104 @@ def authenticate(token):
 @auth.error_handler
 def auth_error(status):
     return Response(
-        response=json.dumps(
-            {"code": status, "name": "Unauthorised"},
-            separators=(",", ":"),
-        ),
+        response=serialiser.dumps({"code": status, "name": "Unauthorised"}),
         mimetype="application/json",
         status=status,
     )
 
 
+def sort_column():
+    """Get the User column to sort on from the query string."""
+    sort_by = request.args.get("sort", default="email_address", type=str)
+    if sort_by not in sortable:
+        raise BadRequest(f"Sort must be one of {', '.join(sortable)}")
+    return getattr(User, sort_by)
+
+
+def filter_users(query):
+    """Apply the email address filter from the query string to a query."""
+    email_query = request.args.get("email_address", type=str)
+
+    if email_query:
+        query = query.filter(contains(User.email_address, email_query))
+    return query
+
+
 @bp.route("", methods=["GET"])
 @produces("application/json", "text/csv")
 @auth.login_required
+@cached_list("user_account")
 def list_users():
     """Get a list of Users."""
-    sort_by = request.args.get("sort", type=str)
-    email_query = request.args.get("email_address", type=str)
+    cursor = request.args.get("cursor", type=str)
+    limit = page_limit()
 
-    query = User.query
+    sort = sort_column()
+    default_fields = list_fields if "application/json" in request.headers.getlist("accept") else fields
+    selected = requested_fields(fields, default_fields)
 
-    if email_query:
-        query = query.filter(User.email_address.ilike(f"%{email_query}%"))
-    if sort_by and sort_by != "email_address":
-        query = query.order_by(getattr(User, sort_by).asc(), User.email_address.asc())
-    else:
-        query = query.order_by(User.email_address.asc())
+    # Rows of only the selected columns, and those needed for paging, rather than User entities
+    query = filter_users(db.session.query(*field_columns(User, selected, sort, User.id)))
+
+    etag, last_modified = collection_version(*table_version("user_account"))
+    if not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
 
-    users = query.all()
+    users, next_cursor = paginate(query, sort, User.id, limit, cursor)
 
     if users:
         if "application/json" in request.headers.getlist("accept"):
-            results = [user.list_item() for user in users]
+            with timed("serialise"):
+                body = serialiser.dump_rows(selected, users)
 
-            return Response(
-                json.dumps(results, separators=(",", ":")),
-                mimetype="application/json",
+            response = Response(body, mimetype="application/json", status=200)
+            return set_validators(set_pagination_headers(response, next_cursor, limit), etag, last_modified)
+        elif "text/csv" in request.headers.getlist("accept"):
+            # Write the page as one chunk, rather than a chunk per row
+            response = Response(
+                generate_csv([[row[: len(selected)] for row in users]], [field.upper() for field in selected]),
+                mimetype="text/csv",
                 status=200,
             )
-        elif "text/csv" in request.headers.getlist("accept"):
-
-            def generate():
-                data = StringIO()
-                w = csv.writer(data)
-
-                # write header
-                w.writerow(("ID", "EMAIL_ADDRESS", "CREATED_AT", "UPDATED_AT"))
-                yield data.getvalue()
-                data.seek(0)
-                data.truncate(0)
-
-                # write each item
-                for user in users:
-                    w.writerow(
-                        (
-                            user.id,
-                            user.email_address,
-                            user.created_at.isoformat(),
-                            user.updated_at.isoformat() if user.updated_at else None,
-                        )
-                    )
-                    yield data.getvalue()
-                    data.seek(0)
-                    data.truncate(0)
-
-            response = Response(generate(), mimetype="text/csv", status=200)
             response.headers.set("Content-Disposition", "attachment", filename="users.csv")
-            return response
+            return set_validators(set_pagination_headers(response, next_cursor, limit), etag, last_modified)
     else:
-        return Response(mimetype="application/json", status=204)
+        return set_validators(Response(mimetype="application/json", status=204), etag, last_modified)
+
+
+@bp.route("/export", methods=["GET"])
+@produces(*EXPORT_TYPES)
+@auth.login_required
+def export_users():
+    """Stream every User as JSON, CSV, NDJSON, Arrow or Parquet."""
+    columns = (User.id, User.email_address, User.created_at, User.updated_at)
+    statement = filter_users(select(*columns)).order_by(sort_column(), User.id)
+    chunks = stream_rows(
+        db.session.get_bind(clause=statement),
+        statement,
+        current_app.config["EXPORT_CHUNK_SIZE"],
+        current_app.config["EXPORT_STATEMENT_TIMEOUT"],
+    )
+
+    return export_response(chunks, columns, "users")
 
 
 @bp.route("", methods=["POST"])
 @consumes("application/json")
 @produces("application/json")
+@idempotent
 def create_user():
     """Create a new User."""
 
     # Validate request against schema
     try:
-        validate(request.json, user_schema, format_checker=FormatChecker())
+        user_validator.validate(request.json)
     except ValidationError as e:
         raise BadRequest(e.message)
 
-    if User.query.filter_by(email_address=request.json["email_address"]).first() is not None:
+    user = User.create(request.json["email_address"], request.json["password"])
+    if user is None:
         raise BadRequest()
-
-    user = User(email_address=request.json["email_address"], password=request.json["password"])
-
-    db.session.add(user)
     db.session.commit()
 
     response = Response(repr(user), mimetype="application/json", status=201)
@@ -130,9 +153,21 @@ def create_user():
 @auth.login_required
 def get_user(user_id):
     """Get a User with a specific ID."""
-    user = User.query.get_or_404(str(user_id))
+    selected = requested_fields(fields, None)
+    query = User.query
+    if selected:
+        # Load the selected columns, and those the ETag and Last-Modified headers are made from
+        query = query.options(load_only(*field_columns(User, selected, User.created_at, User.updated_at)))
+    user = query.get_or_404(str(user_id))
 
-    return Response(repr(user), mimetype="application/json", status=200)
+    # Each selection of fields is a different representation, so needs its own ETag
+    etag = make_etag(user.etag, *selected) if selected else user.etag
+    if not_modified(etag, user.last_modified):
+        return not_modified_response(etag, user.last_modified)
+
+    body = serialiser.dumps({field: getattr(user, field) for field in selected}) if selected else repr(user)
+    response = Response(body, mimetype="application/json", status=200)
+    return set_validators(response, etag, user.last_modified)
 
 
 @bp.route("/<uuid:user_id>", methods=["PUT"])
@@ -146,18 +181,20 @@ def update_user(user_id):
 
     # Validate request against schema
     try:
-        validate(request.json, user_schema, format_checker=FormatChecker())
+        user_validator.validate(request.json)
     except ValidationError as e:
         raise BadRequest(e.message)
 
     user = User.query.get_or_404(str(user_id))
 
-    user.email_address = request.json["email_address"].lower().strip()
-    user.password = request.json["password"]
+    if not user.change_email_address(request.json["email_address"]):
+        raise BadRequest()
+    user.set_password(request.json["password"])
     user.updated_at = datetime.utcnow()
 
     db.session.add(user)
     db.session.commit()
+    token_cache.delete(user.id)
 
     return Response(repr(user), mimetype="application/json", status=200)
 
@@ -172,7 +209,10 @@ def delete_user(user_id):
 
     user = User.query.get_or_404(str(user_id))
 
+    # Delete the User's Things first, rather than by cascade, so they leave tombstones
+    delete_things(Thing.user_id == user.id)
     db.session.delete(user)
     db.session.commit()
+    token_cache.delete(user.id)
 
     return Response(mimetype="application/json", status=204)
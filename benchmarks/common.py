@@ -0,0 +1,96 @@
+import resource
+import statistics
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+
+from app import create_app, create_asgi_app, db
+from app.models import Thing, User
+from config import Config
+
+COLOURS = ("red", "green", "blue", "yellow", "orange", "purple", "black", "white")
+# Password of the Users seeded in benchmark databases, not a secret
+PASSWORD = "CorrectHorseBatteryStaple"  # nosec B105
+
+
+class BenchmarkConfig(Config):
+    ADMISSION_AUTH = 0
+    ADMISSION_EXPORT = 0
+    ADMISSION_READ = 0
+    ADMISSION_WRITE = 0
+    RATELIMIT_ENABLED = False
+    SECRET_KEY = Config.SECRET_KEY or "benchmark"
+
+
+def create_benchmark_app():
+    app = create_app(BenchmarkConfig)
+    app.logger.disabled = True
+    return app
+
+
+def create_benchmark_asgi_app():
+    asgi_app = create_asgi_app(BenchmarkConfig)
+    asgi_app.app.logger.disabled = True
+    return asgi_app
+
+
+def seed(users, things, batch_size=10000):
+    """Top up the database to the given number of Users and Things."""
+    db.create_all()
+    password = User("seed@example.com", PASSWORD).password
+    created_at = datetime.utcnow()
+
+    existing_users = db.session.scalar(func.count(User.id))
+    for start in range(existing_users, users, batch_size):
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "email_address": f"user{i}@example.com",
+                "password": password,
+                "created_at": created_at - timedelta(seconds=i),
+            }
+            for i in range(start, min(start + batch_size, users))
+        ]
+        db.session.execute(insert(User), rows)
+        db.session.commit()
+
+    user_ids = db.session.scalars(db.select(User.id).order_by(User.email_address).limit(users)).all()
+    existing_things = db.session.scalar(func.count(Thing.id))
+    for start in range(existing_things, things, batch_size):
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": user_ids[i % len(user_ids)],
+                "name": f"Thing {i}",
+                "colour": COLOURS[i % len(COLOURS)],
+                "created_at": created_at - timedelta(seconds=i),
+            }
+            for i in range(start, min(start + batch_size, things))
+        ]
+        db.session.execute(insert(Thing), rows)
+        db.session.commit()
+
+
+def bearer_headers(user=None, accept="application/json"):
+    """Get request headers authenticating as a seeded User."""
+    user = user or User.query.filter_by(email_address="user0@example.com").one()
+    return {"Authorization": f"Bearer {user.generate_token()}", "Accept": accept}
+
+
+def peak_rss(children=False):
+    """Get the peak resident set size of this process, or its largest finished child process, in MiB."""
+    return resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def latency_summary(samples):
+    """Summarise request durations in seconds as mean and percentile latencies in milliseconds."""
+    if len(samples) < 2:
+        samples = samples * 2
+    percentiles = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p95_ms": round(percentiles[94] * 1000, 2),
+        "p99_ms": round(percentiles[98] * 1000, 2),
+    }
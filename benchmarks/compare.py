@@ -0,0 +1,58 @@
+"""Compare two sets of benchmarks.endpoints results and flag regressions.
+
+Prints the change in p95 latency, throughput and peak RSS for each endpoint and
+server in both results, and exits with status 1 if any got worse by more than
+--threshold percent, so it can fail a CI job.
+
+    python -m benchmarks.compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+
+import argparse
+import json
+import sys
+
+# Metrics to compare, and whether a higher value is better
+METRICS = (("p95_ms", False), ("throughput_rps", True), ("peak_rss_mib", False))
+
+
+def load(path):
+    with open(path) as f:
+        results = json.load(f)
+    return results, {(result["endpoint"], result["server"]): result for result in results["results"]}
+
+
+def change(before, after):
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10, help="percentage change counted as a regression")
+    args = parser.parse_args()
+
+    baseline, before = load(args.baseline)
+    candidate, after = load(args.candidate)
+    print(f"{baseline['commit']} -> {candidate['commit']}")
+
+    regressions = 0
+    for key in sorted(before.keys() & after.keys()):
+        changes = []
+        for metric, higher_is_better in METRICS:
+            percent = change(before[key][metric], after[key][metric])
+            regressed = (-percent if higher_is_better else percent) > args.threshold
+            regressions += regressed
+            changes.append(
+                f"{metric} {before[key][metric]} -> {after[key][metric]} "
+                f"({percent:+.1f}%{' REGRESSION' if regressed else ''})"
+            )
+        print(f"{key[0]} [{key[1]}]: {', '.join(changes)}")
+
+    if regressions:
+        print(f"{regressions} regressions of more than {args.threshold}%", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark response compression with each content coding.
+
+Tops up the database at DATABASE_URL, then requests a single Thing, a page of
+Things as JSON and CSV, the JSON and CSV exports and the OpenAPI document
+through the Flask test client, accepting each installed content coding in turn
+and then none. Reports the median CPU time per request and the bytes sent, so
+each coding can be compared with sending the body as it is.
+
+    python -m benchmarks.compression --things 100000 --repeats 20
+"""
+
+import argparse
+import json
+import statistics
+from time import process_time
+
+from app.compression import ENCODINGS
+from app.models import Thing
+from benchmarks.common import bearer_headers, create_benchmark_app, seed
+
+
+def requests(page_size):
+    """Get each request to measure as (name, path, Accept header)."""
+    thing = Thing.query.first()
+    return [
+        ("get_thing", f"/v1/things/{thing.id}", "application/json"),
+        ("list_things", f"/v1/things?limit={page_size}", "application/json"),
+        ("list_things_csv", f"/v1/things?limit={page_size}", "text/csv"),
+        ("export_things", "/v1/things/export", "application/json"),
+        ("export_things_csv", "/v1/things/export", "text/csv"),
+        ("openapi", "/openapi", "application/json"),
+    ]
+
+
+def measure(client, path, headers, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = process_time()
+        response = client.get(path, headers=headers)
+        size = len(response.get_data())
+        response.close()
+        samples.append(process_time() - start)
+    return round(statistics.median(samples) * 1000, 2), size, response.headers.get("Content-Encoding", "identity")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--things", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_benchmark_app()
+    with app.app_context():
+        seed(users=args.users, things=args.things)
+        client = app.test_client()
+
+        for name, path, accept in requests(args.page_size):
+            for encoding in ENCODINGS + ("identity",):
+                headers = {**bearer_headers(accept=accept), "Accept-Encoding": encoding}
+                cpu_ms, size_bytes, sent_encoding = measure(client, path, headers, args.repeats)
+                print(
+                    json.dumps(
+                        {"request": name, "encoding": sent_encoding, "cpu_ms": cpu_ms, "bytes": size_bytes},
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
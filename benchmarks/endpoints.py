@@ -0,0 +1,335 @@
+"""Benchmark every endpoint through the Flask test client, gunicorn and an ASGI server.
+
+Tops up the database at DATABASE_URL to the given numbers of Users and Things,
+then runs each endpoint in a fresh process, so that peak RSS is its own, and
+reports latency percentiles, throughput and peak RSS. The test client sends
+requests one at a time in process; servers (sync gunicorn, and uvicorn running
+flask_rest_api_asgi) are started for each endpoint and sent requests from
+--concurrency threads. Peak RSS for a server is that of its largest process.
+
+Results are printed as JSON lines and written to --output, which defaults to
+benchmarks/results/<commit>.json, for comparing with benchmarks.compare.
+
+    python -m benchmarks.endpoints --users 10000 --things 1000000
+    python -m benchmarks.endpoints --server client --endpoints list_things get_thing
+"""
+
+import argparse
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess  # nosec B404
+import sys
+import uuid
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.client import HTTPConnection
+from time import perf_counter, sleep
+
+from sqlalchemy import delete, insert
+
+from app import db
+from app.models import Thing, User
+from benchmarks.common import PASSWORD, bearer_headers, create_benchmark_app, latency_summary, peak_rss, seed
+
+
+class Fixtures(object):
+    """Headers and IDs for building requests, with a Thing and a User to delete for each request."""
+
+    def __init__(self, count):
+        user = User.query.filter_by(email_address="user0@example.com").one()
+        now = datetime.utcnow()
+
+        self.user_id = user.id
+        self.thing_id = Thing.query.filter_by(user_id=user.id).first().id
+        self.headers = {**bearer_headers(user), "Content-Type": "application/json"}
+        self.csv_headers = bearer_headers(user, accept="text/csv")
+        credentials = b64encode(f"{user.email_address}:{PASSWORD}".encode()).decode()
+        self.basic_headers = {"Authorization": f"Basic {credentials}", "Accept": "application/json"}
+
+        self.thing_ids = [str(uuid.uuid4()) for _ in range(count)]
+        self.user_ids = [str(uuid.uuid4()) for _ in range(count)]
+        if count:
+            db.session.execute(
+                insert(Thing),
+                [
+                    {"id": id, "user_id": user.id, "name": "Delete Me", "colour": "red", "created_at": now}
+                    for id in self.thing_ids
+                ],
+            )
+            db.session.execute(
+                insert(User),
+                [
+                    {
+                        "id": id,
+                        "email_address": f"delete-{id}@example.com",
+                        "password": user.password,
+                        "created_at": now,
+                    }
+                    for id in self.user_ids
+                ],
+            )
+            db.session.commit()
+        self.user_headers = [bearer_headers(db.session.get(User, id)) for id in self.user_ids]
+
+    def clean_up(self):
+        """Delete the Things and Users that weren't deleted by requests, so they don't build up across runs."""
+        if self.thing_ids:
+            db.session.execute(delete(Thing).where(Thing.id.in_(self.thing_ids)))
+            db.session.execute(delete(User).where(User.id.in_(self.user_ids)))
+            db.session.commit()
+
+
+# Each endpoint builds its i-th request from the fixtures, as (method, path, headers, JSON body), and
+# optionally limits the number of requests when each one is expensive
+ENDPOINTS = {
+    "openapi": (lambda f, i: ("GET", "/openapi", {"Accept-Encoding": "gzip"}, None), None),
+    "get_token": (lambda f, i: ("GET", "/v1/auth/token", f.basic_headers, None), 50),
+    "list_things": (lambda f, i: ("GET", "/v1/things", f.headers, None), None),
+    "list_things_csv": (lambda f, i: ("GET", "/v1/things", f.csv_headers, None), None),
+    "search_things": (lambda f, i: ("GET", f"/v1/things?name=hing%20{i % 100}", f.headers, None), None),
+    "export_things": (lambda f, i: ("GET", "/v1/things/export", f.headers, None), 5),
+    "thing_stats": (lambda f, i: ("GET", "/v1/things/stats?group_by=day", f.headers, None), None),
+    "sync_things": (lambda f, i: ("GET", "/v1/things?updated_since=2026-01-01T00:00:00Z", f.headers, None), None),
+    "list_deleted_things": (lambda f, i: ("GET", "/v1/things/deleted", f.headers, None), None),
+    "create_thing": (
+        lambda f, i: ("POST", "/v1/things", f.headers, {"name": f"Thing {i}", "colour": "red", "quantity": 1}),
+        None,
+    ),
+    "get_thing": (lambda f, i: ("GET", f"/v1/things/{f.thing_id}", f.headers, None), None),
+    "update_thing": (
+        lambda f, i: (
+            "PUT",
+            f"/v1/things/{f.thing_id}",
+            f.headers,
+            {"name": "Thing 0", "colour": "red", "quantity": 1},
+        ),
+        None,
+    ),
+    "delete_thing": (lambda f, i: ("DELETE", f"/v1/things/{f.thing_ids[i]}", f.headers, None), None),
+    "batch_things": (
+        lambda f, i: (
+            "POST",
+            "/v1/things/batch",
+            f.headers,
+            [{"op": "create", "data": {"name": f"Batch {i} {j}", "colour": "blue", "quantity": 1}} for j in range(100)],
+        ),
+        None,
+    ),
+    "list_users": (lambda f, i: ("GET", "/v1/users", f.headers, None), None),
+    "list_users_csv": (lambda f, i: ("GET", "/v1/users", f.csv_headers, None), None),
+    "search_users": (lambda f, i: ("GET", f"/v1/users?email_address=user{i % 100}", f.headers, None), None),
+    "export_users": (lambda f, i: ("GET", "/v1/users/export", f.headers, None), 5),
+    "create_user": (
+        lambda f, i: (
+            "POST",
+            "/v1/users",
+            {"Accept": "application/json", "Content-Type": "application/json"},
+            {"email_address": f"{uuid.uuid4()}@example.com", "password": PASSWORD},
+        ),
+        50,
+    ),
+    "get_user": (lambda f, i: ("GET", f"/v1/users/{f.user_id}", f.headers, None), None),
+    "update_user": (
+        lambda f, i: (
+            "PUT",
+            f"/v1/users/{f.user_id}",
+            f.headers,
+            {"email_address": "user0@example.com", "password": PASSWORD},
+        ),
+        50,
+    ),
+    "delete_user": (lambda f, i: ("DELETE", f"/v1/users/{f.user_ids[i]}", f.user_headers[i], None), None),
+}
+
+
+def send_with_client(client, request):
+    method, path, headers, body = request
+    start = perf_counter()
+    response = client.open(path, method=method, headers=headers, json=body)
+    response.get_data()
+    return perf_counter() - start, response.status_code
+
+
+def send_with_http(port, request):
+    method, path, headers, body = request
+    start = perf_counter()
+    connection = HTTPConnection("127.0.0.1", port)
+    connection.request(method, path, body=None if body is None else json.dumps(body), headers=headers)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return perf_counter() - start, response.status
+
+
+# Commands to start each server on a port with a number of worker processes
+SERVERS = {
+    "gunicorn": ["gunicorn", "--bind", "127.0.0.1:{port}", "--workers", "{workers}"]
+    + ["benchmarks.common:create_benchmark_app()"],
+    "asgi": ["uvicorn", "--port", "{port}", "--workers", "{workers}", "--no-access-log", "--log-level", "warning"]
+    + ["--factory", "benchmarks.common:create_benchmark_asgi_app"],
+}
+
+
+def start_server(server, workers):
+    """Start a server for the benchmark app on a free port, and wait for it to accept requests."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    command = [argument.format(port=port, workers=workers) for argument in SERVERS[server]]
+    # A fixed command from SERVERS, with numeric arguments
+    process = subprocess.Popen(  # nosec B603
+        [sys.executable, "-m", *command], stderr=subprocess.DEVNULL
+    )
+    for _ in range(300):
+        try:
+            send_with_http(port, ("GET", "/openapi", {}, None))
+            return process, port
+        except OSError:
+            sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{server} didn't start")
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    process.wait()
+
+
+def send_all(app, server, warmup, requests, args):
+    """Send the warmup requests, then time the rest, returning each (duration, status), the total time and peak RSS."""
+    if server == "client":
+        client = app.test_client()
+        for request in warmup:
+            send_with_client(client, request)
+        start = perf_counter()
+        results = [send_with_client(client, request) for request in requests]
+        return results, perf_counter() - start, peak_rss()
+
+    process, port = start_server(server, args.workers)
+    try:
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            list(executor.map(lambda request: send_with_http(port, request), warmup))
+            start = perf_counter()
+            results = list(executor.map(lambda request: send_with_http(port, request), requests))
+            elapsed = perf_counter() - start
+    finally:
+        stop_server(process)
+    return results, elapsed, peak_rss(children=True)
+
+
+def run(endpoint, server, args):
+    """Benchmark one endpoint and print the result as JSON."""
+    build, max_requests = ENDPOINTS[endpoint]
+    count = min(args.requests, max_requests or args.requests)
+
+    app = create_benchmark_app()
+    with app.app_context():
+        fixtures = Fixtures(args.warmup + count)
+    requests = [build(fixtures, i) for i in range(args.warmup + count)]
+    warmup, requests = requests[: args.warmup], requests[args.warmup :]
+
+    try:
+        results, elapsed, rss = send_all(app, server, warmup, requests, args)
+    finally:
+        with app.app_context():
+            fixtures.clean_up()
+
+    print(
+        json.dumps(
+            {
+                "endpoint": endpoint,
+                "server": server,
+                "requests": len(results),
+                "errors": sum(1 for _, status in results if status >= 400),
+                **latency_summary([duration for duration, _ in results]),
+                "throughput_rps": round(len(results) / elapsed, 1),
+                "peak_rss_mib": round(rss, 1),
+            }
+        )
+    )
+
+
+def commit():
+    """Get the current git commit, marked as dirty if there are uncommitted changes."""
+    try:
+        # Git from the PATH, only to label the results with the commit
+        sha = subprocess.run(  # nosec B603 B607
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        # Git from the PATH, only to label the results with the commit
+        status = subprocess.run(  # nosec B603 B607
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return sha.stdout.strip() + ("-dirty" if status.stdout.strip() else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--things", type=int, default=1000000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent requests to servers")
+    parser.add_argument("--workers", type=int, default=4, help="server worker processes")
+    parser.add_argument("--server", choices=("client", *SERVERS, "all"), default="all")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--output", help="path to write the results to")
+    parser.add_argument("--run", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        return run(*args.run, args)
+
+    app = create_benchmark_app()
+    with app.app_context():
+        seed(args.users, args.things)
+        if db.engine.dialect.name == "postgresql":
+            db.session.execute(db.text("ANALYZE"))
+            db.session.commit()
+
+    servers = ("client", *SERVERS) if args.server == "all" else (args.server,)
+    results = []
+    for server in servers:
+        for endpoint in args.endpoints:
+            # This module again, with the arguments it was run with
+            output = subprocess.run(  # nosec B603
+                [sys.executable, "-m", "benchmarks.endpoints", *sys.argv[1:], "--run", endpoint, server],
+                stdout=subprocess.PIPE,
+                text=True,
+                check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(json.dumps(result))
+            results.append(result)
+
+    version = commit()
+    path = args.output or os.path.join("benchmarks", "results", f"{version}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "commit": version,
+                "created_at": datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "database": app.config["SQLALCHEMY_DATABASE_URI"].split(":")[0],
+                "users": args.users,
+                "things": args.things,
+                "concurrency": args.concurrency,
+                "workers": args.workers,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
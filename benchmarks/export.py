@@ -0,0 +1,95 @@
+"""Benchmark streaming exports of Things.
+
+Seeds the database at DATABASE_URL, then measures time to first byte, total time
+and peak RSS of a full export in each format, and the time a client takes to
+parse it. Each export runs in a fresh process so that peak RSS isn't carried
+over from seeding or from other runs.
+
+    python -m benchmarks.export --things 1000000
+"""
+
+import argparse
+import csv
+import io
+import json
+import subprocess  # nosec B404
+import sys
+from time import perf_counter
+
+from app.export import ARROW_STREAM, EXPORT_TYPES, NDJSON, PARQUET, pyarrow
+from benchmarks.common import bearer_headers, create_benchmark_app, peak_rss, seed
+
+
+def parse(accept, body):
+    """Parse an export as a client would, into rows or a table."""
+    if accept == "text/csv":
+        return list(csv.reader(io.StringIO(body.decode("UTF-8"))))
+    if accept == NDJSON:
+        return [json.loads(line) for line in body.splitlines()]
+    if accept == ARROW_STREAM:
+        return pyarrow.ipc.open_stream(body).read_all()
+    if accept == PARQUET:
+        return pyarrow.parquet.read_table(pyarrow.BufferReader(body))
+    return json.loads(body)
+
+
+def run(accept):
+    app = create_benchmark_app()
+    with app.app_context():
+        headers = bearer_headers(accept=accept)
+    client = app.test_client()
+
+    baseline = peak_rss()
+    start = perf_counter()
+    response = client.get("/v1/things/export", headers=headers, buffered=False)
+    chunks = response.iter_encoded()
+    body = [next(chunks)]
+    first_byte = perf_counter() - start
+    body.extend(chunks)
+    total = perf_counter() - start
+    response.close()
+    rss = peak_rss()
+
+    body = b"".join(body)
+    start = perf_counter()
+    parse(accept, body)
+    parsed = perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "accept": accept,
+                "bytes": len(body),
+                "ttfb_ms": round(first_byte * 1000, 1),
+                "total_s": round(total, 2),
+                "baseline_rss_mib": round(baseline, 1),
+                "peak_rss_mib": round(rss, 1),
+                "parse_ms": round(parsed * 1000, 1),
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--things", type=int, default=1000000)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        return run(args.run)
+
+    app = create_benchmark_app()
+    with app.app_context():
+        seed(args.users, args.things)
+
+    for accept in EXPORT_TYPES:
+        # This module again, with fixed arguments
+        subprocess.run(  # nosec B603
+            [sys.executable, "-m", "benchmarks.export", "--run", accept], check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark updating and deleting a Thing as the number of Things its owner has grows.
+
+Seeds a User for each size at DATABASE_URL, owning that many Things, then times
+PUT and DELETE requests against some of them. The Things deleted are put back
+on the next run.
+
+    python -m benchmarks.ownership --sizes 10 1000 10000 100000
+"""
+
+import argparse
+import json
+import statistics
+import uuid
+from datetime import datetime
+from time import perf_counter
+
+from sqlalchemy import func, insert
+
+from app import db
+from app.models import Thing, User
+from benchmarks.common import PASSWORD, bearer_headers, create_benchmark_app
+
+
+def seed_owner(size):
+    """Get a User owning the given number of Things, topping up those deleted by earlier runs."""
+    email_address = f"owner{size}@example.com"
+    user = User.query.filter_by(email_address=email_address).first()
+    if user is None:
+        user = User(email_address, PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+    now = datetime.utcnow()
+    existing = db.session.scalar(db.select(func.count(Thing.id)).where(Thing.user_id == user.id))
+    for start in range(existing, size, 10000):
+        rows = [
+            {"id": str(uuid.uuid4()), "user_id": user.id, "name": f"Thing {i}", "colour": "red", "created_at": now}
+            for i in range(start, min(start + 10000, size))
+        ]
+        db.session.execute(insert(Thing), rows)
+        db.session.commit()
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000, 100000])
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_benchmark_app()
+    client = app.test_client()
+
+    for size in args.sizes:
+        with app.app_context():
+            db.create_all()
+            user = seed_owner(size)
+            headers = bearer_headers(user)
+            thing_ids = [thing.id for thing in Thing.query.filter_by(user_id=user.id).limit(args.requests)]
+        if not thing_ids:
+            print(json.dumps({"things_per_user": size, "skipped": "no Things to update"}))
+            continue
+
+        timings = {"PUT": [], "DELETE": []}
+        for thing_id in thing_ids:
+            start = perf_counter()
+            client.put(
+                f"/v1/things/{thing_id}", json={"name": "Pear", "colour": "green", "quantity": 1}, headers=headers
+            )
+            timings["PUT"].append(perf_counter() - start)
+
+            start = perf_counter()
+            client.delete(f"/v1/things/{thing_id}", headers=headers)
+            timings["DELETE"].append(perf_counter() - start)
+
+        for method, samples in timings.items():
+            print(
+                json.dumps(
+                    {
+                        "things_per_user": size,
+                        "method": method,
+                        "median_ms": round(statistics.median(samples) * 1000, 2),
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
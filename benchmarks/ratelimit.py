@@ -0,0 +1,69 @@
+"""Benchmark rate limit checks against each storage.
+
+Times hits on a fixed window limit, from several threads at once, with in process
+storage, the hybrid storage sharing in process, and if REDIS_URL is set, Redis
+with and without the hybrid storage in front of it. Also reports how many hits
+were allowed, against a limit that the hybrid storage can overshoot by up to the
+sync batch size.
+
+    python -m benchmarks.ratelimit --hits 10000 --threads 8
+"""
+
+import argparse
+import json
+import os
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+import app.ratelimit  # noqa: F401 registers the hybrid storage
+
+
+def storages():
+    yield "memory://"
+    yield "hybrid+memory://"
+    if os.environ.get("REDIS_URL"):
+        yield os.environ["REDIS_URL"]
+        yield f"hybrid+{os.environ['REDIS_URL']}"
+
+
+def measure(uri, hits, threads, limit, sync_batch):
+    options = {"sync_batch": sync_batch} if uri.startswith("hybrid+") else {}
+    limiter = FixedWindowRateLimiter(storage_from_string(uri, **options))
+    item = parse(limit)
+    limiter.storage.reset()
+
+    def hit(i):
+        start = perf_counter()
+        allowed = limiter.hit(item, "benchmark")
+        return perf_counter() - start, allowed
+
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(hit, range(hits)))
+    samples = sorted(seconds for seconds, allowed in results)
+    return {
+        "storage": uri,
+        "p50_us": round(statistics.median(samples) * 1e6, 1),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1] * 1e6, 1),
+        "allowed": sum(allowed for seconds, allowed in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hits", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--limit", default="1000 per hour")
+    parser.add_argument("--sync-batch", type=int, default=10)
+    args = parser.parse_args()
+
+    for uri in storages():
+        print(json.dumps(measure(uri, args.hits, args.threads, args.limit, args.sync_batch)))
+
+
+if __name__ == "__main__":
+    main()
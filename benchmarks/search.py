@@ -0,0 +1,60 @@
+"""Benchmark substring search of Thing names and User email addresses as the tables grow.
+
+Tops up the database at DATABASE_URL to each size in turn, then times filtered
+list requests. Run with SEARCH_MODE=fulltext to compare full-text search.
+
+    python -m benchmarks.search --sizes 10000 100000 1000000
+"""
+
+import argparse
+import json
+import statistics
+from time import perf_counter
+
+from app import db
+from benchmarks.common import bearer_headers, create_benchmark_app, seed
+
+URLS = (
+    "/v1/things?name=hing 12",
+    "/v1/things?name=99",
+    "/v1/users?email_address=user12",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_benchmark_app()
+    client = app.test_client()
+
+    for size in args.sizes:
+        with app.app_context():
+            seed(users=size // 100, things=size)
+            if db.engine.dialect.name == "postgresql":
+                db.session.execute(db.text("ANALYZE"))
+                db.session.commit()
+            headers = bearer_headers()
+
+        for url in URLS:
+            samples = []
+            for _ in range(args.requests):
+                start = perf_counter()
+                client.get(url, headers=headers)
+                samples.append(perf_counter() - start)
+            print(
+                json.dumps(
+                    {
+                        "things": size,
+                        "users": size // 100,
+                        "url": url,
+                        "median_ms": round(statistics.median(samples) * 1000, 2),
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
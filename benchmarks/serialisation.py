@@ -0,0 +1,67 @@
+"""Benchmark loading and serialising lists of Things as JSON.
+
+Tops up the database at DATABASE_URL to the largest size, then for each size
+times the old path of loading Thing entities and serialising dicts built from
+them with the standard library, against loading row tuples and serialising them
+with each installed JSON library.
+
+    python -m benchmarks.serialisation --sizes 1000 10000 100000
+"""
+
+import argparse
+import json
+import statistics
+from time import perf_counter
+
+from app import db, serialiser
+from app.models import Thing
+from app.serialisation import backends
+from benchmarks.common import create_benchmark_app, seed
+
+KEYS = ("id", "name", "colour")
+
+
+def entities(size):
+    things = Thing.query.order_by(Thing.name, Thing.id).limit(size).all()
+    return json.dumps(
+        [{"id": thing.id, "name": thing.name, "colour": thing.colour} for thing in things], separators=(",", ":")
+    ).encode("UTF-8")
+
+
+def rows(size):
+    columns = (Thing.id, Thing.name, Thing.colour, Thing.created_at, Thing.updated_at)
+    return serialiser.dump_rows(KEYS, db.session.query(*columns).order_by(Thing.name, Thing.id).limit(size).all())
+
+
+def measure(function, size, repeats):
+    samples = []
+    for _ in range(repeats):
+        db.session.expunge_all()
+        start = perf_counter()
+        body = function(size)
+        samples.append(perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 2), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_benchmark_app()
+    with app.app_context():
+        seed(users=max(args.sizes) // 100, things=max(args.sizes))
+
+        for size in args.sizes:
+            median_ms, size_bytes = measure(entities, size, args.repeats)
+            print(json.dumps({"items": size, "path": "entities+json", "median_ms": median_ms, "bytes": size_bytes}))
+
+            for name in backends:
+                serialiser.use(name)
+                median_ms, size_bytes = measure(rows, size, args.repeats)
+                print(json.dumps({"items": size, "path": f"rows+{name}", "median_ms": median_ms, "bytes": size_bytes}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare throughput of sync gunicorn and the ASGI server as concurrent connections grow.
+
+Tops up the database at DATABASE_URL, then starts each server in turn with the
+same number of worker processes and sends a mix of requests to the given
+endpoints from each number of concurrent connections.
+
+    python -m benchmarks.serving --concurrency 1 16 64 256 --endpoints get_thing list_things get_token
+"""
+
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from benchmarks.common import create_benchmark_app, latency_summary, seed
+from benchmarks.endpoints import ENDPOINTS, SERVERS, Fixtures, send_with_http, start_server, stop_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--things", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=1000, help="requests at each concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--workers", type=int, default=4, help="server worker processes")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=["get_thing", "list_things"])
+    args = parser.parse_args()
+
+    app = create_benchmark_app()
+    with app.app_context():
+        seed(args.users, args.things)
+        fixtures = Fixtures(args.requests * len(args.concurrency) * len(SERVERS))
+
+    builders = [ENDPOINTS[endpoint][0] for endpoint in args.endpoints]
+    requests = iter(builders[i % len(builders)](fixtures, i) for i in range(len(fixtures.thing_ids)))
+
+    for server in SERVERS:
+        process, port = start_server(server, args.workers)
+        try:
+            for concurrency in args.concurrency:
+                batch = [next(requests) for _ in range(args.requests)]
+                with ThreadPoolExecutor(concurrency) as executor:
+                    start = perf_counter()
+                    results = list(executor.map(lambda request: send_with_http(port, request), batch))
+                    elapsed = perf_counter() - start
+
+                print(
+                    json.dumps(
+                        {
+                            "server": server,
+                            "workers": args.workers,
+                            "concurrency": concurrency,
+                            "endpoints": args.endpoints,
+                            "requests": len(results),
+                            "errors": sum(1 for _, status in results if status >= 400),
+                            **latency_summary([duration for duration, _ in results]),
+                            "throughput_rps": round(len(results) / elapsed, 1),
+                        }
+                    )
+                )
+        finally:
+            stop_server(process)
+
+
+if __name__ == "__main__":
+    main()
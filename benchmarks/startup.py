@@ -0,0 +1,113 @@
+"""Benchmark startup time and worker memory, with and without gunicorn's preload mode.
+
+Times importing the app package and calling create_app in fresh processes. Then
+starts gunicorn with and without --preload, timing how long it takes to serve a
+first request, and after sending some requests reports each worker's RSS and
+PSS (its share of memory shared with other processes, which preloading should
+lower). Memory is read from /proc, so needs Linux.
+
+    python -m benchmarks.startup --workers 4 --repeats 5
+"""
+
+import argparse
+import json
+import socket
+import statistics
+import subprocess  # nosec B404
+import sys
+from time import perf_counter, sleep
+
+from benchmarks.endpoints import send_with_http, stop_server
+
+TIME_STARTUP = """
+import json
+from time import perf_counter
+start = perf_counter()
+import app
+imported = perf_counter()
+from benchmarks.common import create_benchmark_app
+create_benchmark_app()
+print(json.dumps({"import_ms": (imported - start) * 1000, "create_app_ms": (perf_counter() - imported) * 1000}))
+"""
+
+
+def time_startup(repeats):
+    command = [sys.executable, "-c", TIME_STARTUP]
+    # This interpreter with a fixed script
+    samples = [json.loads(subprocess.check_output(command)) for _ in range(repeats)]  # nosec B603
+    return {name: round(statistics.median(sample[name] for sample in samples), 1) for name in samples[0]}
+
+
+def memory(pid):
+    """Get the RSS and PSS of a process in MiB."""
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if line.startswith(("Rss:", "Pss:")))
+    return {name.lower() + "_mib": round(int(value.split()[0]) / 1024, 1) for name, value in fields.items()}
+
+
+def workers_of(pid, count):
+    """Get the worker process IDs of a gunicorn master, once it has started the given number."""
+    for _ in range(100):
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            workers = [int(child) for child in f.read().split()]
+        if len(workers) >= count:
+            return workers
+        sleep(0.1)
+    raise RuntimeError("gunicorn didn't start all its workers")
+
+
+def start_gunicorn(workers, preload):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    command = ["gunicorn", "--bind", f"127.0.0.1:{port}", "--workers", str(workers)]
+    command += ["--preload"] if preload else []
+    start = perf_counter()
+    # Gunicorn with numeric arguments
+    process = subprocess.Popen(  # nosec B603
+        [sys.executable, "-m", *command, "benchmarks.common:create_benchmark_app()"], stderr=subprocess.DEVNULL
+    )
+    for _ in range(600):
+        try:
+            send_with_http(port, ("GET", "/openapi", {}, None))
+            return process, port, perf_counter() - start
+        except OSError:
+            sleep(0.05)
+    process.kill()
+    raise RuntimeError("gunicorn didn't start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=100, help="requests to send before measuring memory")
+    args = parser.parse_args()
+
+    print(json.dumps({"startup": "create_app", **time_startup(args.repeats)}))
+
+    for preload in (False, True):
+        process, port, ready_s = start_gunicorn(args.workers, preload)
+        try:
+            for _ in range(args.requests):
+                send_with_http(port, ("GET", "/openapi", {}, None))
+            workers = [memory(pid) for pid in workers_of(process.pid, args.workers)]
+            print(
+                json.dumps(
+                    {
+                        "startup": "gunicorn --preload" if preload else "gunicorn",
+                        "workers": len(workers),
+                        "first_response_ms": round(ready_s * 1000, 1),
+                        "master": memory(process.pid),
+                        "mean_worker_rss_mib": round(statistics.mean(worker["rss_mib"] for worker in workers), 1),
+                        "mean_worker_pss_mib": round(statistics.mean(worker["pss_mib"] for worker in workers), 1),
+                    }
+                )
+            )
+        finally:
+            stop_server(process)
+
+
+if __name__ == "__main__":
+    main()
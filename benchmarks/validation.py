@@ -0,0 +1,49 @@
+"""Benchmark JSON schema validation of request bodies.
+
+Compares building a validator and format checker for every request, as
+jsonschema.validate does, with the validators compiled once at startup.
+
+    python -m benchmarks.validation
+"""
+
+import argparse
+import json
+from timeit import timeit
+
+from jsonschema import FormatChecker, validate
+
+from app.openapi import spec, validators
+from benchmarks.common import PASSWORD
+
+REQUESTS = {
+    "ThingRequest": {"name": "Apple", "colour": "red", "quantity": 4},
+    "UserRequest": {"email_address": "mash@example.com", "password": PASSWORD},
+    "ThingBatchOperation": {
+        "op": "update",
+        "id": "d9ecd6ee-3ab8-473b-9585-bc653024bed9",
+        "data": {"name": "Apple", "colour": "red", "quantity": 4},
+    },
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=5000)
+    args = parser.parse_args()
+
+    for name, instance in REQUESTS.items():
+        schema = spec["components"]["schemas"][name]
+        validator = validators[name]
+        results = {"schema": name, "compiled_us": timeit(lambda: validator.validate(instance), number=args.number)}
+        if "$ref" not in json.dumps(schema):
+            results["per_request_us"] = timeit(
+                lambda: validate(instance, schema, format_checker=FormatChecker()), number=args.number
+            )
+        for key in ("compiled_us", "per_request_us"):
+            if key in results:
+                results[key] = round(results[key] / args.number * 1000000, 1)
+        print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
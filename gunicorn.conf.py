@@ -0,0 +1,51 @@
+"""Gunicorn settings, read from the working directory when gunicorn starts.
+
+With --preload the app is created once in the master process and workers are
+forked from it, sharing its memory copy-on-write and starting faster. Each
+worker then drops the connections and threads it inherited, so none are shared
+between processes.
+
+Metrics are shared between workers through files in PROMETHEUS_MULTIPROC_DIR, so
+/metrics reports every worker's and not just the one that answers the scrape. It
+defaults to a new temporary directory for each run, removed when gunicorn exits.
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+
+# Threads in each worker. Above one gunicorn uses gthread workers, which are needed to serve event streams
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+
+# Set before the app, and so prometheus_client, is imported by the master or a worker
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+    created_multiprocess_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+else:
+    created_multiprocess_dir = None
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        # Stop the garbage collector writing to the preloaded objects, which would copy their pages into each worker
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from app import after_fork
+
+        after_fork(server.app.wsgi())
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Drop the gauges of a worker that's gone, keeping its counters and histograms in the totals
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    if created_multiprocess_dir:
+        shutil.rmtree(created_multiprocess_dir, ignore_errors=True)
@@ -0,0 +1,33 @@
+"""Thing tombstone table
+
+Revision ID: 3f1b8c2d9e4a
+Revises: 7da7603cf68d
+Create Date: 2026-10-18 20:45:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3f1b8c2d9e4a"
+down_revision = "7da7603cf68d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "thing_tombstone",
+        sa.Column("id", postgresql.UUID(), nullable=False),
+        sa.Column("user_id", postgresql.UUID(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_thing_tombstone_deleted_at_id", "thing_tombstone", ["deleted_at", "id"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_thing_tombstone_deleted_at_id", table_name="thing_tombstone")
+    op.drop_table("thing_tombstone")
@@ -0,0 +1,67 @@
+"""Initial schema
+
+Revision ID: 69e5cbf1b909
+Revises:
+Create Date: 2026-10-18 20:20:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "69e5cbf1b909"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_account",
+        sa.Column("id", postgresql.UUID(), nullable=False),
+        sa.Column("password", sa.LargeBinary(), nullable=False),
+        sa.Column("email_address", sa.String(length=256), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_user_account_email_address"), "user_account", ["email_address"], unique=True)
+    op.create_index("ix_user_account_created_at_id", "user_account", ["created_at", "id"], unique=False)
+    op.create_index("ix_user_account_updated_at_id", "user_account", ["updated_at", "id"], unique=False)
+    op.create_table(
+        "thing",
+        sa.Column("id", postgresql.UUID(), nullable=False),
+        sa.Column("user_id", postgresql.UUID(), nullable=False),
+        sa.Column("name", sa.String(length=32), nullable=False),
+        sa.Column("colour", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["user_account.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_thing_colour"), "thing", ["colour"], unique=False)
+    op.create_index(op.f("ix_thing_created_at"), "thing", ["created_at"], unique=False)
+    op.create_index(op.f("ix_thing_name"), "thing", ["name"], unique=False)
+    op.create_index(op.f("ix_thing_user_id"), "thing", ["user_id"], unique=False)
+    op.create_index("ix_thing_colour_id", "thing", ["colour", "id"], unique=False)
+    op.create_index("ix_thing_created_at_id", "thing", ["created_at", "id"], unique=False)
+    op.create_index("ix_thing_name_id", "thing", ["name", "id"], unique=False)
+    op.create_index("ix_thing_updated_at_id", "thing", ["updated_at", "id"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_thing_updated_at_id", table_name="thing")
+    op.drop_index("ix_thing_name_id", table_name="thing")
+    op.drop_index("ix_thing_created_at_id", table_name="thing")
+    op.drop_index("ix_thing_colour_id", table_name="thing")
+    op.drop_index(op.f("ix_thing_user_id"), table_name="thing")
+    op.drop_index(op.f("ix_thing_name"), table_name="thing")
+    op.drop_index(op.f("ix_thing_created_at"), table_name="thing")
+    op.drop_index(op.f("ix_thing_colour"), table_name="thing")
+    op.drop_table("thing")
+    op.drop_index("ix_user_account_updated_at_id", table_name="user_account")
+    op.drop_index("ix_user_account_created_at_id", table_name="user_account")
+    op.drop_index(op.f("ix_user_account_email_address"), table_name="user_account")
+    op.drop_table("user_account")
@@ -0,0 +1,49 @@
+"""Trigram and full-text search indexes
+
+Revision ID: 7cab1189faf3
+Revises: 69e5cbf1b909
+Create Date: 2026-10-18 20:25:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7cab1189faf3"
+down_revision = "69e5cbf1b909"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_thing_name_trgm",
+        "thing",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_thing_name_tsvector",
+        "thing",
+        [sa.text("to_tsvector('simple', name)")],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_user_account_email_address_trgm",
+        "user_account",
+        ["email_address"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"email_address": "gin_trgm_ops"},
+    )
+
+
+def downgrade():
+    op.drop_index("ix_user_account_email_address_trgm", table_name="user_account")
+    op.drop_index("ix_thing_name_tsvector", table_name="thing")
+    op.drop_index("ix_thing_name_trgm", table_name="thing")
@@ -0,0 +1,83 @@
+"""Thing daily count summary table
+
+Revision ID: 7da7603cf68d
+Revises: 7cab1189faf3
+Create Date: 2026-10-18 20:40:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "7da7603cf68d"
+down_revision = "7cab1189faf3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "thing_daily_count",
+        sa.Column("user_id", postgresql.UUID(), nullable=False),
+        sa.Column("colour", sa.String(), nullable=False),
+        sa.Column("day", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "colour", "day"),
+    )
+    op.execute(
+        """
+        INSERT INTO thing_daily_count (user_id, colour, day, count)
+        SELECT user_id, colour, date_trunc('day', created_at), count(*) FROM thing GROUP BY 1, 2, 3
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION refresh_thing_daily_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE thing_daily_count AS c SET count = c.count - o.count
+                FROM (
+                    SELECT user_id, colour, date_trunc('day', created_at) AS day, count(*) AS count
+                    FROM old_rows GROUP BY 1, 2, 3
+                ) AS o
+                WHERE c.user_id = o.user_id AND c.colour = o.colour AND c.day = o.day;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO thing_daily_count (user_id, colour, day, count)
+                SELECT user_id, colour, date_trunc('day', created_at), count(*) FROM new_rows GROUP BY 1, 2, 3
+                ON CONFLICT (user_id, colour, day) DO UPDATE SET count = thing_daily_count.count + excluded.count;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER thing_daily_count_insert AFTER INSERT ON thing
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_thing_daily_count()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER thing_daily_count_update AFTER UPDATE ON thing
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION refresh_thing_daily_count()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER thing_daily_count_delete AFTER DELETE ON thing
+        REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_thing_daily_count()
+        """
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER thing_daily_count_delete ON thing")
+    op.execute("DROP TRIGGER thing_daily_count_update ON thing")
+    op.execute("DROP TRIGGER thing_daily_count_insert ON thing")
+    op.execute("DROP FUNCTION refresh_thing_daily_count()")
+    op.drop_table("thing_daily_count")
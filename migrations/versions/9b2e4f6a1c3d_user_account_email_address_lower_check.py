@@ -0,0 +1,28 @@
+"""User account email address lower case check
+
+Revision ID: 9b2e4f6a1c3d
+Revises: 3f1b8c2d9e4a
+Create Date: 2026-10-18 20:50:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9b2e4f6a1c3d"
+down_revision = "3f1b8c2d9e4a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "UPDATE user_account SET email_address = lower(email_address) WHERE email_address <> lower(email_address)"
+    )
+    op.create_check_constraint(
+        "ck_user_account_email_address_lower", "user_account", "email_address = lower(email_address)"
+    )
+
+
+def downgrade():
+    op.drop_constraint("ck_user_account_email_address_lower", "user_account", type_="check")
@@ -0,0 +1,29 @@
+"""Table generation table
+
+Revision ID: b4c7d2e9f1a8
+Revises: 9b2e4f6a1c3d
+Create Date: 2026-10-18 20:55:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b4c7d2e9f1a8"
+down_revision = "9b2e4f6a1c3d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "table_generation",
+        sa.Column("table_name", sa.String(length=64), nullable=False),
+        sa.Column("generation", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("table_name"),
+    )
+
+
+def downgrade():
+    op.drop_table("table_generation")
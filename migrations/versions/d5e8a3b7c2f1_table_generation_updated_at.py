@@ -0,0 +1,24 @@
+"""Table generation updated at
+
+Revision ID: d5e8a3b7c2f1
+Revises: b4c7d2e9f1a8
+Create Date: 2026-10-18 22:10:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d5e8a3b7c2f1"
+down_revision = "b4c7d2e9f1a8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("table_generation", sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column("table_generation", "updated_at")
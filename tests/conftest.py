@@ -0,0 +1,79 @@
+import fakeredis
+import pytest
+import redis
+
+from app import create_app, db
+from app.models import Thing, User
+from config import Config
+
+PASSWORD = "CorrectHorseBatteryStaple"
+
+
+class TestingConfig(Config):
+    __test__ = False
+
+    BCRYPT_ROUNDS = 4
+    RATELIMIT_ENABLED = False
+    SECRET_KEY = "testing"
+    SERVER_TIMING = False
+    SQLALCHEMY_REPLICA_URIS = []
+    TESTING = True
+
+
+@pytest.fixture
+def config(tmp_path):
+    """Settings for the app under test, which a test can change before the app is created."""
+    return {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}"}
+
+
+@pytest.fixture
+def app(config):
+    app = create_app(type("Config", (TestingConfig,), config))
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User("user@example.com", PASSWORD)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def headers(user):
+    return {"Authorization": f"Bearer {user.generate_token()}", "Accept": "application/json"}
+
+
+@pytest.fixture
+def make_things(user):
+    """Create Things owned by the user with the given names."""
+
+    def make_things(*names, colour="red"):
+        things = [Thing(name=name, colour=colour, user_id=user.id) for name in names]
+        db.session.add_all(things)
+        db.session.commit()
+        return things
+
+    return make_things
+
+
+@pytest.fixture
+def shared_redis(monkeypatch):
+    """Point Redis URLs at one fake Redis server, shared like a real one between processes."""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis.Redis,
+        "from_url",
+        staticmethod(lambda url, **options: fakeredis.FakeStrictRedis(server=server, **options)),
+    )
+    return server
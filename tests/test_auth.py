@@ -0,0 +1,34 @@
+import pytest
+
+from app import token_cache
+
+THING = {"name": "Apple", "colour": "red", "quantity": 1}
+
+
+def test_token_cache_is_off_without_redis(app):
+    assert app.config["TOKEN_CACHE_TTL"] == 0
+    assert token_cache.backend is None
+
+
+def test_deleted_user_is_unauthorised(client, headers, user):
+    assert client.delete(f"/v1/users/{user.id}", headers=headers).status_code == 204
+
+    assert client.post("/v1/things", json=THING, headers=headers).status_code == 401
+
+
+@pytest.mark.usefixtures("shared_redis")
+def test_user_deleted_in_another_process_is_unauthorised(app, client, headers, user):
+    app.config.update(TOKEN_CACHE_TTL=60, TOKEN_CACHE_STORAGE_URL="redis://localhost:6379/0")
+    token_cache.init_app(app)
+    assert client.get(f"/v1/users/{user.id}", headers=headers).status_code == 200
+    assert token_cache.get(user.id) is not None
+
+    client.delete(f"/v1/users/{user.id}", headers=headers)
+    # As another process would, with its own connection to the same Redis
+    token_cache.init_app(app)
+
+    assert client.post("/v1/things", json=THING, headers=headers).status_code == 401
+
+
+def test_invalid_token_is_unauthorised(client, headers):
+    assert client.get("/v1/things", headers={**headers, "Authorization": "Bearer nonsense"}).status_code == 401
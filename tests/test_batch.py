@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from app import db
+from app.models import Thing, User
+
+
+@pytest.fixture
+def other_user(app):
+    user = User("other@example.com", "CorrectHorseBatteryStaple")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def batch(client, headers, operations):
+    return client.post("/v1/things/batch", json=operations, headers=headers)
+
+
+def test_creates_things(client, headers, user):
+    response = batch(client, headers, [{"op": "create", "data": {"name": "apple", "colour": "red", "quantity": 1}}] * 3)
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json] == [201, 201, 201]
+    things = Thing.query.all()
+    assert sorted(thing.id for thing in things) == sorted(result["id"] for result in response.json)
+    assert {(thing.name, thing.user_id) for thing in things} == {("Apple", user.id)}
+
+
+def test_updates_and_deletes_owned_things(client, headers, make_things):
+    apple, pear = make_things("Apple", "Pear")
+
+    response = batch(
+        client,
+        headers,
+        [
+            {"op": "update", "id": apple.id, "data": {"name": "green apple", "colour": "green", "quantity": 1}},
+            {"op": "delete", "id": pear.id},
+        ],
+    )
+
+    assert response.json == [{"status": 200, "id": apple.id}, {"status": 204, "id": pear.id}]
+    db.session.expire_all()
+    assert [(thing.name, thing.colour) for thing in Thing.query.all()] == [("Green Apple", "green")]
+
+
+def test_things_owned_by_someone_else_or_missing_arent_touched(client, headers, other_user):
+    theirs = Thing("Apple", "red", other_user.id)
+    db.session.add(theirs)
+    db.session.commit()
+    missing = "d9ecd6ee-3ab8-473b-9585-bc653024bed9"
+
+    response = batch(client, headers, [{"op": "delete", "id": theirs.id}, {"op": "delete", "id": missing}])
+
+    assert [result["status"] for result in response.json] == [403, 404]
+    assert db.session.get(Thing, theirs.id) is not None
+
+
+def test_invalid_operations_dont_stop_the_others(client, headers):
+    response = batch(
+        client,
+        headers,
+        [
+            {"op": "create", "data": {"name": "Apple"}},
+            {"op": "create", "data": {"name": "Pear", "colour": "green", "quantity": 1}},
+            {"op": "delete", "id": "not-a-uuid"},
+        ],
+    )
+
+    assert [result["status"] for result in response.json] == [400, 201, 400]
+    assert [thing.name for thing in Thing.query.all()] == ["Pear"]
+
+
+def test_a_thing_can_only_appear_once(client, headers, make_things):
+    (apple,) = make_things("Apple")
+
+    response = batch(client, headers, [{"op": "delete", "id": apple.id}, {"op": "delete", "id": apple.id}])
+
+    assert [result["status"] for result in response.json] == [204, 400]
+
+
+def test_accepts_ndjson(client, headers):
+    lines = [json.dumps({"op": "create", "data": {"name": name, "colour": "red", "quantity": 1}}) for name in "ab"]
+
+    response = client.post(
+        "/v1/things/batch", data="\n".join(lines), headers={**headers, "Content-Type": "application/x-ndjson"}
+    )
+
+    assert [result["status"] for result in response.json] == [201, 201]
+
+
+def test_writes_in_chunks(app, client, headers):
+    app.config["BATCH_CHUNK_SIZE"] = 2
+    operations = [{"op": "create", "data": {"name": str(i), "colour": "red", "quantity": 1}} for i in range(5)]
+
+    response = batch(client, headers, operations)
+
+    assert [result["status"] for result in response.json] == [201] * 5
+    assert Thing.query.count() == 5
+
+
+@pytest.mark.parametrize("body", [{"op": "create"}, [{}] * 3])
+def test_rejects_bodies_that_arent_arrays_or_are_too_big(app, client, headers, body):
+    app.config["BATCH_MAX_SIZE"] = 2
+
+    assert batch(client, headers, body).status_code == 400
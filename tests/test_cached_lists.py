@@ -0,0 +1,124 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.exc import OperationalError
+
+from app import cached_lists, db
+from app.cached_lists import cache_key, generation, list_cache_requests
+from app.models import Thing
+
+
+def hits():
+    return sum(value for _, labels, value in list_cache_requests.samples() if labels["result"] == "hit")
+
+
+def insert_behind_the_cache(user):
+    """Add a Thing without going through the session, so the generation isn't bumped."""
+    with db.engine.begin() as connection:
+        connection.execute(
+            insert(Thing),
+            {
+                "id": str(uuid.uuid4()),
+                "name": "Hidden",
+                "colour": "red",
+                "user_id": user.id,
+                "created_at": datetime.utcnow(),
+            },
+        )
+
+
+def names(response):
+    return [thing["name"] for thing in response.json]
+
+
+def test_repeated_list_is_served_from_the_cache(client, headers, user, make_things):
+    make_things("Apple")
+    first = client.get("/v1/things", headers=headers)
+    insert_behind_the_cache(user)
+    before = hits()
+
+    again = client.get("/v1/things", headers=headers)
+
+    assert hits() == before + 1
+    assert again.get_data() == first.get_data()
+    assert names(again) == ["Apple"]
+
+
+def test_write_bumps_the_generation_so_the_cache_isnt_used(client, headers, user, make_things):
+    client.get("/v1/things", headers=headers)
+    insert_behind_the_cache(user)
+
+    client.post("/v1/things", json={"name": "Pear", "colour": "green", "quantity": 1}, headers=headers)
+
+    assert names(client.get("/v1/things", headers=headers)) == ["Hidden", "Pear"]
+
+
+def test_generation_is_bumped_once_per_commit(app, make_things):
+    make_things("Apple")
+    make_things("Pear", "Plum")
+
+    assert generation("thing") == 2
+    assert generation("user_account") == 1
+
+
+def test_rolled_back_writes_dont_bump_the_generation(app, user):
+    db.session.add(Thing("Apple", "red", user.id))
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+
+    assert generation("thing") == 0
+
+
+def test_write_is_rolled_back_when_the_generation_cant_be_bumped(app, user, monkeypatch):
+    def fail(*args):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(cached_lists, "dialect_insert", fail)
+    db.session.add(Thing("Apple", "red", user.id))
+    with pytest.raises(OperationalError):
+        db.session.commit()
+    db.session.rollback()
+
+    assert Thing.query.count() == 0
+    assert generation("thing") == 0
+
+
+def test_generation_is_bumped_in_the_writes_transaction(app, user):
+    statements = []
+    db.session.add(Thing("Apple", "red", user.id))
+
+    @event.listens_for(db.session().connection(), "before_cursor_execute")
+    def listener(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    db.session.commit()
+
+    assert [statement.split()[:3] for statement in statements] == [
+        ["INSERT", "INTO", "thing"],
+        ["INSERT", "INTO", "table_generation"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "query_string, other",
+    [
+        ("colour=red&sort=name", "colour=red%26sort%3Dname"),
+        ("colour=red&name=a", "colour=red%26name%3Da"),
+        ("name=a%3Ab", "name=a&b"),
+    ],
+)
+def test_query_strings_with_the_same_pairs_joined_get_different_keys(app, query_string, other):
+    with app.test_request_context(f"/v1/things?{query_string}"):
+        key = cache_key(1)
+    with app.test_request_context(f"/v1/things?{other}"):
+        assert cache_key(1) != key
+
+
+def test_argument_order_doesnt_change_the_key(app):
+    with app.test_request_context("/v1/things?colour=red&sort=name"):
+        key = cache_key(1)
+    with app.test_request_context("/v1/things?sort=name&colour=red"):
+        assert cache_key(1) == key
@@ -0,0 +1,149 @@
+import gzip
+import sys
+import zlib
+
+import brotli
+import pytest
+
+from app import compression
+from app.compression import ENCODINGS, compress, compress_chunks
+
+THING = {"name": "Apple", "colour": "red", "quantity": 1}
+
+
+def decompress(data, encoding):
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "br":
+        return brotli.decompress(data)
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def list_things(client, headers, accept_encoding, accept="application/json"):
+    return client.get("/v1/things", headers={**headers, "Accept": accept, "Accept-Encoding": accept_encoding})
+
+
+@pytest.fixture
+def things(make_things):
+    return make_things(*(f"Thing {i}" for i in range(20)))
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("br", "br"),
+        ("gzip, br", "br"),
+        ("gzip;q=1, br;q=0.5", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("*", ENCODINGS[0]),
+    ],
+)
+def test_best_accepted_encoding_is_used(client, headers, things, accept_encoding, expected):
+    response = list_things(client, headers, accept_encoding)
+
+    assert response.headers["Content-Encoding"] == expected
+    assert "Accept-Encoding" in response.vary
+    assert decompress(response.get_data(), expected).startswith(b"[")
+
+
+def test_zstd_is_preferred_when_installed(client, headers, things):
+    pytest.importorskip("zstandard")
+
+    response = list_things(client, headers, "gzip, br, zstd")
+
+    assert response.headers["Content-Encoding"] == "zstd"
+    assert decompress(response.get_data(), "zstd").startswith(b"[")
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "compress", ""])
+def test_unaccepted_encodings_are_sent_uncompressed(client, headers, things, accept_encoding):
+    response = list_things(client, headers, accept_encoding)
+
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data().startswith(b"[")
+
+
+def test_small_bodies_are_sent_uncompressed(app, client, headers, make_things):
+    (apple,) = make_things("Apple")
+
+    response = client.get(f"/v1/things/{apple.id}", headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert len(response.get_data()) < app.config["COMPRESSION_MIN_SIZE"]
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.vary
+
+
+def test_types_without_levels_arent_compressed(client, headers, things):
+    pytest.importorskip("pyarrow")
+
+    response = client.get(
+        "/v1/things/export",
+        headers={**headers, "Accept": "application/vnd.apache.parquet", "Accept-Encoding": "gzip"},
+    )
+
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" not in response.vary
+
+
+def test_compressed_responses_get_weak_etags(client, headers, things):
+    response = list_things(client, headers, "gzip")
+
+    assert response.headers["ETag"].startswith("W/")
+    not_modified = client.get(
+        "/v1/things", headers={**headers, "Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_each_streamed_chunk_can_be_decompressed_as_it_arrives(encoding):
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(31)
+    elif encoding == "br":
+        decompressor = brotli.Decompressor()
+    else:
+        decompressor = pytest.importorskip("zstandard").ZstdDecompressor().decompressobj()
+    decompress_chunk = decompressor.process if encoding == "br" else decompressor.decompress
+    chunks = ["first chunk,", b"second chunk,", "", "third chunk"]
+
+    compressed = list(compress_chunks(iter(chunks), encoding, 6))
+
+    assert [decompress_chunk(chunk) for chunk in compressed[:3]] == [b"first chunk,", b"second chunk,", b"third chunk"]
+
+
+def test_streamed_chunks_are_closed():
+    closed = []
+
+    def chunks():
+        try:
+            yield b"data"
+        finally:
+            closed.append(True)
+
+    generator = chunks()
+    compressed = compress_chunks(generator, "gzip", 6)
+    next(compressed)
+    compressed.close()
+
+    assert closed == [True]
+
+
+def test_static_bodies_are_compressed_once_at_the_highest_level(client, monkeypatch):
+    compression._static.clear()
+    calls = []
+
+    def counting_compress(data, encoding, level):
+        calls.append((encoding, level))
+        return compress(data, encoding, level)
+
+    # The app package's compression attribute is the extension, so patch the module itself
+    monkeypatch.setattr(sys.modules["app.compression"], "compress", counting_compress)
+
+    first = client.get("/openapi", headers={"Accept-Encoding": "br"})
+    second = client.get("/openapi", headers={"Accept-Encoding": "br"})
+
+    assert calls == [("br", 11)]
+    assert first.get_data() == second.get_data()
+    assert brotli.decompress(first.get_data()).startswith(b"{")
@@ -0,0 +1,82 @@
+from sqlalchemy import event
+
+from app import db
+from app.models import TableGeneration
+
+HTTP_EPOCH = "Thu, 01 Jan 1970 00:00:00 GMT"
+
+
+def list_things(client, headers, query_string="", **conditions):
+    return client.get(f"/v1/things{query_string}", headers={**headers, **conditions})
+
+
+def test_list_has_validators_from_the_table_generation(client, headers, make_things):
+    make_things("Apple")
+
+    response = list_things(client, headers)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert response.last_modified is not None
+
+
+def test_list_written_outside_the_app_has_no_validators(client, headers, make_things):
+    make_things("Apple")
+    db.session.execute(db.delete(TableGeneration))
+    db.session.commit()
+
+    response = list_things(client, headers, **{"If-None-Match": "*", "If-Modified-Since": HTTP_EPOCH})
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert "Last-Modified" not in response.headers
+
+
+def test_list_is_not_modified_until_a_write(client, headers, make_things):
+    make_things("Apple")
+    etag = list_things(client, headers).headers["ETag"]
+
+    assert list_things(client, headers, **{"If-None-Match": etag}).status_code == 304
+
+    make_things("Pear")
+    response = list_things(client, headers, **{"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_deletes_change_the_list_version(client, headers, make_things):
+    apple, pear = make_things("Apple", "Pear")
+    etag = list_things(client, headers).headers["ETag"]
+
+    client.delete(f"/v1/things/{pear.id}", headers=headers)
+
+    assert list_things(client, headers, **{"If-None-Match": etag}).status_code == 200
+
+
+def test_list_is_not_modified_since_the_last_write(client, headers, make_things):
+    make_things("Apple")
+    last_modified = list_things(client, headers).headers["Last-Modified"]
+
+    assert list_things(client, headers, **{"If-Modified-Since": last_modified}).status_code == 304
+
+
+def test_each_query_string_has_its_own_etag(client, headers, make_things):
+    make_things("Apple")
+
+    assert list_things(client, headers).headers["ETag"] != list_things(client, headers, "?colour=red").headers["ETag"]
+
+
+def test_list_version_doesnt_aggregate_the_table(app, client, headers, make_things):
+    make_things("Apple")
+    statements = []
+
+    def listener(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        list_things(client, headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    assert not [statement for statement in statements if "count(" in statement.lower()]
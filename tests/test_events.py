@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import admission, db
+from app.models import Thing, ThingTombstone
+
+THREADED = {"wsgi.multithread": True}
+
+
+@pytest.fixture
+def event_headers(headers):
+    return {**headers, "Accept": "text/event-stream"}
+
+
+def read_event(response):
+    """Read chunks of a stream until one that isn't a heartbeat."""
+    for chunk in response.response:
+        if not chunk.startswith(b":"):
+            return chunk
+
+
+def test_stream_gets_events_for_committed_changes(client, headers, event_headers):
+    response = client.get("/v1/things/events", headers=event_headers, environ_overrides=THREADED)
+    created = client.post("/v1/things", json={"name": "Apple", "colour": "red", "quantity": 1}, headers=headers)
+
+    try:
+        assert response.status_code == 200
+        assert read_event(response).startswith(b"event: created\ndata: {" + f'"id":"{created.json["id"]}"'.encode())
+    finally:
+        response.close()
+
+
+def test_stream_needs_a_threaded_server(client, event_headers):
+    assert client.get("/v1/things/events", headers=event_headers).status_code == 501
+
+
+def test_streams_are_capped_by_default(app, client, event_headers):
+    assert app.config["ADMISSION_EVENTS"] > 0
+    streams = []
+    try:
+        for _ in range(app.config["ADMISSION_EVENTS"]):
+            streams.append(client.get("/v1/things/events", headers=event_headers, environ_overrides=THREADED))
+        assert all(response.status_code == 200 for response in streams)
+
+        response = client.get("/v1/things/events", headers=event_headers, environ_overrides=THREADED)
+        assert response.status_code == 503
+    finally:
+        for response in streams:
+            response.close()
+    assert admission.in_flight["events"] == 0
+
+
+def age_tombstones(days):
+    db.session.execute(update(ThingTombstone).values(deleted_at=datetime.utcnow() - timedelta(days=days)))
+    db.session.commit()
+
+
+def test_old_tombstones_are_deleted_with_later_things(app, client, headers, make_things):
+    old, new = make_things("Old", "New")
+    client.delete(f"/v1/things/{old.id}", headers=headers)
+    age_tombstones(app.config["TOMBSTONE_RETENTION"] + 1)
+
+    client.delete(f"/v1/things/{new.id}", headers=headers)
+
+    assert [tombstone.id for tombstone in ThingTombstone.query.all()] == [new.id]
+
+
+def test_tombstones_are_kept_forever_without_retention(app, client, headers, make_things):
+    app.config["TOMBSTONE_RETENTION"] = 0
+    old, new = make_things("Old", "New")
+    client.delete(f"/v1/things/{old.id}", headers=headers)
+    age_tombstones(1000)
+
+    client.delete(f"/v1/things/{new.id}", headers=headers)
+
+    assert ThingTombstone.query.count() == 2
+    assert client.get("/v1/things/deleted?deleted_since=2000-01-01T00:00:00Z", headers=headers).status_code == 200
+
+
+def test_deleted_since_before_the_retention_period_is_gone(app, client, headers):
+    deleted_since = (datetime.utcnow() - timedelta(days=app.config["TOMBSTONE_RETENTION"] + 1)).isoformat()
+
+    assert client.get(f"/v1/things/deleted?deleted_since={deleted_since}", headers=headers).status_code == 410
+
+
+def test_deleted_since_within_the_retention_period_lists_tombstones(client, headers, make_things):
+    (apple,) = make_things("Apple")
+    client.delete(f"/v1/things/{apple.id}", headers=headers)
+    deleted_since = (datetime.utcnow() - timedelta(days=1)).isoformat()
+
+    response = client.get(f"/v1/things/deleted?deleted_since={deleted_since}", headers=headers)
+
+    assert [tombstone["id"] for tombstone in response.json] == [apple.id]
+    assert Thing.query.count() == 0
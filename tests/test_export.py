@@ -0,0 +1,169 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app.export import generate_csv, generate_json
+
+
+@pytest.fixture
+def config(config):
+    return {**config, "EXPORT_CHUNK_SIZE": 2, "COMPRESSION_MIN_SIZE": 0}
+
+
+def export(client, headers, path="/v1/things/export", accept="application/json", **extra):
+    return client.get(path, headers={**headers, "Accept": accept, **extra}, buffered=False)
+
+
+def csv_rows(data):
+    return list(csv.reader(io.StringIO(data.decode("UTF-8"))))
+
+
+def test_json_export_is_written_a_chunk_at_a_time(client, headers, make_things):
+    make_things("Apple", "Kiwi", "Pear", "Grape", "Plum")
+
+    response = export(client, headers)
+    chunks = list(response.iter_encoded())
+
+    assert response.mimetype == "application/json"
+    assert len(chunks) == 4
+    assert [thing["name"] for thing in json.loads(b"".join(chunks))] == ["Apple", "Grape", "Kiwi", "Pear", "Plum"]
+
+
+@pytest.mark.parametrize("sizes", [[], [1], [2, 2], [2, 2, 1]])
+def test_json_chunks_join_into_one_array(sizes):
+    chunks = [[(f"{size}-{i}",) for i in range(size)] for size in sizes]
+
+    body = b"".join(generate_json(chunks, ["name"]))
+
+    assert json.loads(body) == [{"name": row[0]} for rows in chunks for row in rows]
+
+
+def test_csv_export_has_a_header_and_a_row_for_each_thing(client, headers, make_things):
+    make_things("Apple", "Pear", "Kiwi")
+
+    response = export(client, headers, accept="text/csv")
+    rows = csv_rows(response.get_data())
+
+    assert response.headers["Content-Disposition"] == "attachment; filename=things.csv"
+    assert rows[0] == ["ID", "NAME", "COLOUR", "CREATED_AT", "UPDATED_AT"]
+    assert [row[1] for row in rows[1:]] == ["Apple", "Kiwi", "Pear"]
+
+
+def test_csv_chunks_follow_the_header():
+    chunks = list(generate_csv([[("a", 1)], [("b", 2), ("c", None)]], ["NAME", "QUANTITY"]))
+
+    assert chunks == ["NAME,QUANTITY\r\n", "a,1\r\n", "b,2\r\nc,\r\n"]
+
+
+def test_export_is_filtered_and_sorted(client, headers, make_things):
+    make_things("Plum", "Apple")
+    make_things("Kiwi", "Grape", colour="green")
+
+    body = export(client, headers, "/v1/things/export?colour=red&sort=name").get_data()
+
+    assert [thing["name"] for thing in json.loads(body)] == ["Apple", "Plum"]
+
+
+def test_export_sorted_by_creation_time(client, headers, make_things):
+    make_things("Plum")
+    make_things("Apple")
+
+    body = export(client, headers, "/v1/things/export?sort=created_at").get_data()
+
+    assert [thing["name"] for thing in json.loads(body)] == ["Plum", "Apple"]
+
+
+def test_export_with_an_invalid_sort_is_a_bad_request(client, headers):
+    assert export(client, headers, "/v1/things/export?sort=quantity").status_code == 400
+
+
+def test_empty_json_export_is_an_empty_array(client, headers):
+    response = export(client, headers, "/v1/things/export?colour=blue")
+
+    assert response.status_code == 200
+    assert response.get_data() == b"[]"
+
+
+def test_empty_csv_export_is_only_a_header(client, headers):
+    response = export(client, headers, "/v1/things/export?colour=blue", accept="text/csv")
+
+    assert response.status_code == 200
+    assert csv_rows(response.get_data()) == [["ID", "NAME", "COLOUR", "CREATED_AT", "UPDATED_AT"]]
+
+
+def test_export_is_compressed_as_it_streams(client, headers, make_things):
+    make_things("Apple", "Kiwi", "Pear", "Grape", "Plum")
+
+    response = export(client, headers, **{"Accept-Encoding": "gzip"})
+    chunks = list(response.iter_encoded())
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert len(chunks) > 1
+    assert len(json.loads(gzip.decompress(b"".join(chunks)))) == 5
+
+
+def test_users_export(client, headers, user):
+    body = export(client, headers, "/v1/users/export?email_address=user").get_data()
+
+    assert [exported["email_address"] for exported in json.loads(body)] == [user.email_address]
+
+
+def test_ndjson_export_has_an_object_per_line(client, headers, make_things):
+    make_things("Apple", "Kiwi", "Pear")
+
+    response = export(client, headers, accept="application/x-ndjson")
+    chunks = list(response.iter_encoded())
+
+    assert response.mimetype == "application/x-ndjson"
+    assert len(chunks) == 2
+    lines = b"".join(chunks).decode("UTF-8").splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["Apple", "Kiwi", "Pear"]
+
+
+def test_empty_ndjson_export_is_empty(client, headers):
+    assert export(client, headers, "/v1/things/export?colour=blue", accept="application/x-ndjson").get_data() == b""
+
+
+def test_arrow_export_keeps_uuids_and_timestamps_typed(client, headers, make_things):
+    pyarrow = pytest.importorskip("pyarrow")
+    apple, pear, plum = make_things("Apple", "Pear", "Plum")
+
+    response = export(client, headers, accept="application/vnd.apache.arrow.stream")
+    reader = pyarrow.ipc.open_stream(response.get_data())
+    batches = list(reader)
+
+    assert response.headers["Content-Disposition"] == "attachment; filename=things.arrows"
+    assert reader.schema.field("id").type == pyarrow.uuid()
+    assert reader.schema.field("created_at").type == pyarrow.timestamp("us", tz="UTC")
+    assert [batch.num_rows for batch in batches] == [2, 1]
+    table = pyarrow.Table.from_batches(batches)
+    assert table.column("name").to_pylist() == ["Apple", "Pear", "Plum"]
+    assert [str(value) for value in table.column("id").to_pylist()] == [apple.id, pear.id, plum.id]
+
+
+def test_parquet_export_has_a_row_group_per_chunk(client, headers, make_things):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    make_things("Apple", "Pear", "Plum")
+
+    response = export(client, headers, accept="application/vnd.apache.parquet")
+    parquet = pyarrow.parquet.ParquetFile(io.BytesIO(response.get_data()))
+
+    assert response.headers["Content-Disposition"] == "attachment; filename=things.parquet"
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.read().column("name").to_pylist() == ["Apple", "Pear", "Plum"]
+
+
+def test_empty_arrow_export_has_only_a_schema(client, headers):
+    pyarrow = pytest.importorskip("pyarrow")
+
+    response = export(client, headers, "/v1/things/export?colour=blue", accept="application/vnd.apache.arrow.stream")
+    reader = pyarrow.ipc.open_stream(response.get_data())
+
+    assert reader.schema.names == ["id", "name", "colour", "created_at", "updated_at"]
+    assert reader.read_all().num_rows == 0
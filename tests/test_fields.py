@@ -0,0 +1,91 @@
+import csv
+import io
+
+import pytest
+
+
+def get_thing(client, headers, thing, query_string=""):
+    return client.get(f"/v1/things/{thing.id}{query_string}", headers=headers)
+
+
+def test_list_has_the_default_fields(client, headers, make_things):
+    make_things("Apple")
+
+    assert list(client.get("/v1/things", headers=headers).json[0]) == ["id", "name", "colour"]
+
+
+@pytest.mark.parametrize(
+    "fields, expected",
+    [
+        ("name", ["name"]),
+        ("colour,name", ["name", "colour"]),
+        (" name , id ", ["id", "name"]),
+        ("name,name", ["name"]),
+        ("created_at,user_id", ["user_id", "created_at"]),
+    ],
+)
+def test_list_has_the_selected_fields_in_a_fixed_order(client, headers, make_things, fields, expected):
+    make_things("Apple")
+
+    assert list(client.get(f"/v1/things?fields={fields}", headers=headers).json[0]) == expected
+
+
+@pytest.mark.parametrize("fields", ["password", "name,secret", "id,"])
+def test_unknown_fields_are_a_bad_request(client, headers, user, make_things, fields):
+    (apple,) = make_things("Apple")
+
+    assert client.get(f"/v1/things?fields={fields}", headers=headers).status_code == 400
+    assert get_thing(client, headers, apple, f"?fields={fields}").status_code == 400
+    assert client.get(f"/v1/users/{user.id}?fields={fields}", headers=headers).status_code == 400
+
+
+def test_csv_header_follows_the_selected_fields(client, headers, make_things):
+    make_things("Apple")
+
+    response = client.get("/v1/things?fields=colour,id", headers={**headers, "Accept": "text/csv"})
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+    assert rows[0] == ["ID", "COLOUR"]
+    assert rows[1][1] == "red"
+
+
+def test_csv_has_more_fields_by_default(client, headers, make_things):
+    make_things("Apple")
+
+    response = client.get("/v1/things", headers={**headers, "Accept": "text/csv"})
+
+    assert response.get_data(as_text=True).splitlines()[0] == "ID,NAME,COLOUR,CREATED_AT,UPDATED_AT"
+
+
+def test_thing_has_only_the_selected_fields(client, headers, make_things):
+    (apple,) = make_things("Apple")
+
+    assert get_thing(client, headers, apple, "?fields=name,colour").json == {"name": "Apple", "colour": "red"}
+
+
+def test_each_selection_has_its_own_etag(client, headers, make_things):
+    (apple,) = make_things("Apple")
+
+    whole = get_thing(client, headers, apple).headers["ETag"]
+    name = get_thing(client, headers, apple, "?fields=name").headers["ETag"]
+    colour = get_thing(client, headers, apple, "?fields=colour").headers["ETag"]
+
+    assert len({whole, name, colour}) == 3
+    assert get_thing(client, headers, apple, "?fields=name").headers["ETag"] == name
+    assert get_thing(client, {**headers, "If-None-Match": name}, apple, "?fields=name").status_code == 304
+    assert get_thing(client, {**headers, "If-None-Match": name}, apple, "?fields=colour").status_code == 200
+
+
+def test_list_selections_have_their_own_etags(client, headers, make_things):
+    make_things("Apple")
+
+    assert (
+        client.get("/v1/things?fields=name", headers=headers).headers["ETag"]
+        != client.get("/v1/things?fields=colour", headers=headers).headers["ETag"]
+    )
+
+
+def test_user_has_only_the_selected_fields(client, headers, user):
+    response = client.get(f"/v1/users/{user.id}?fields=email_address", headers=headers)
+
+    assert response.json == {"email_address": "user@example.com"}
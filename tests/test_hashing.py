@@ -0,0 +1,88 @@
+from threading import Event, Thread
+
+import bcrypt
+import pytest
+from werkzeug.exceptions import ServiceUnavailable
+
+from app import db, hasher
+from app.models import User
+from tests.conftest import PASSWORD
+
+
+@pytest.fixture
+def config(config):
+    return {**config, "HASHING_WORKERS": 1, "HASHING_QUEUE_SIZE": 0, "HASHING_RETRY_AFTER": 3}
+
+
+def get_token(client, email_address="user@example.com", password=PASSWORD):
+    return client.get("/v1/auth/token", auth=(email_address, password), headers={"Accept": "application/json"})
+
+
+@pytest.fixture
+def busy_hasher(app):
+    """Hold the only hashing slot until the test ends."""
+    started, release = Event(), Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    thread = Thread(target=hasher._run, args=("check", hold))
+    thread.start()
+    started.wait(5)
+    yield
+    release.set()
+    thread.join()
+
+
+def test_hash_and_check(app):
+    hashed = hasher.hash(PASSWORD)
+
+    assert hasher.check(PASSWORD, hashed)
+    assert not hasher.check("wrong", hashed)
+    assert not hasher.needs_rehash(hashed)
+
+
+@pytest.mark.usefixtures("busy_hasher")
+def test_full_queue_is_rejected_with_retry_after(app):
+    with pytest.raises(ServiceUnavailable) as error:
+        hasher.hash(PASSWORD)
+
+    assert error.value.retry_after == 3
+
+
+@pytest.mark.usefixtures("user", "busy_hasher")
+def test_token_request_gets_503_when_hashing_is_saturated(client):
+    response = get_token(client)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+
+
+def test_password_is_rehashed_on_login_when_the_cost_changes(app, client, user, monkeypatch):
+    monkeypatch.setattr(hasher, "rounds", 5)
+
+    assert get_token(client).status_code == 200
+
+    password = db.session.get(User, user.id).password
+    assert password.startswith(b"$2b$05$")
+    assert bcrypt.checkpw(PASSWORD.encode("UTF-8"), password)
+
+
+def test_password_isnt_rehashed_at_the_same_cost(app, client, user):
+    password = user.password
+
+    get_token(client)
+
+    assert db.session.get(User, user.id).password == password
+
+
+def test_unknown_address_is_checked_against_a_dummy_hash(app, client, monkeypatch):
+    checked = []
+    monkeypatch.setattr(hasher, "check", lambda password, hashed: checked.append((password, hashed)) or False)
+
+    assert get_token(client, "nobody@example.com", "guess").status_code == 401
+
+    [(password, hashed)] = checked
+    assert password == "guess"
+    assert hashed.startswith(b"$2b$04$")
@@ -0,0 +1,92 @@
+import pytest
+
+from app import db, idempotency_cache
+from app.models import Thing, User
+
+THING = {"name": "Apple", "colour": "red", "quantity": 1}
+
+
+@pytest.fixture
+def post(client, headers):
+    def post(path, json, key):
+        return client.post(path, json=json, headers={**headers, "Idempotency-Key": key})
+
+    return post
+
+
+def test_retry_replays_the_first_response(post):
+    first = post("/v1/things", THING, "key")
+    retry = post("/v1/things", THING, "key")
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json == first.json
+    assert retry.headers["Location"] == first.headers["Location"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db.session.query(Thing).count() == 1
+
+
+def test_different_keys_run_the_view(post):
+    post("/v1/things", THING, "first")
+    post("/v1/things", THING, "second")
+
+    assert db.session.query(Thing).count() == 2
+
+
+def test_requests_without_a_key_run_the_view(client, headers):
+    client.post("/v1/things", json=THING, headers=headers)
+    client.post("/v1/things", json=THING, headers=headers)
+
+    assert db.session.query(Thing).count() == 2
+
+
+def test_reusing_a_key_with_a_different_body_is_an_error(post):
+    post("/v1/things", THING, "key")
+
+    assert post("/v1/things", {**THING, "name": "Pear"}, "key").status_code == 422
+
+
+def test_client_errors_are_replayed(post):
+    first = post("/v1/things", {"name": "Apple"}, "key")
+    retry = post("/v1/things", {"name": "Apple"}, "key")
+
+    assert first.status_code == retry.status_code == 400
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+
+@pytest.mark.parametrize("key", ["", "x" * 256])
+def test_key_length_is_checked(post, key):
+    assert post("/v1/things", THING, key).status_code == 400
+
+
+def test_concurrent_duplicate_gets_a_conflict_once_the_wait_is_over(app, post, monkeypatch):
+    app.config["IDEMPOTENCY_WAIT"] = 0.1
+    # Another request holds the claim, and never stores a response
+    monkeypatch.setattr(idempotency_cache, "add", lambda *args: False)
+
+    assert post("/v1/things", THING, "key").status_code == 409
+    assert db.session.query(Thing).count() == 0
+
+
+def test_create_user_retry_doesnt_hash_again_or_fail(client, monkeypatch):
+    body = {"email_address": "new@example.com", "password": "CorrectHorseBatteryStaple"}
+    headers = {"Accept": "application/json", "Idempotency-Key": "key"}
+
+    first = client.post("/v1/users", json=body, headers=headers)
+    monkeypatch.setattr(User, "set_password", lambda *args: pytest.fail("Password hashed again"))
+    retry = client.post("/v1/users", json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json == first.json
+
+
+def test_responses_are_shared_through_redis(app, post, shared_redis):
+    app.config["IDEMPOTENCY_CACHE_STORAGE_URL"] = "redis://localhost:6379/0"
+    idempotency_cache.init_app(app)
+    first = post("/v1/things", THING, "key")
+
+    # As another process would, with its own connection to the same Redis
+    idempotency_cache.init_app(app)
+    retry = post("/v1/things", THING, "key")
+
+    assert retry.json == first.json
+    assert db.session.query(Thing).count() == 1
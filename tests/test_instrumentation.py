@@ -0,0 +1,41 @@
+import pytest
+from flask import g
+from sqlalchemy.exc import OperationalError
+
+from app import db, instrumentation
+
+
+@pytest.fixture
+def request_timings(app):
+    with app.test_request_context("/v1/things"):
+        instrumentation._before_request()
+        yield g
+
+
+def test_statements_are_counted_and_timed(request_timings):
+    db.session.execute(db.text("SELECT 1"))
+
+    assert request_timings.statements["SELECT 1"] == 1
+    assert request_timings.timings["sql"] > 0
+
+
+def test_failed_statements_are_timed_without_leaving_state_on_the_connection(request_timings):
+    # The pooled connection's info, which outlives the session's use of it
+    info = db.session.connection().info
+    with pytest.raises(OperationalError):
+        db.session.execute(db.text("SELECT * FROM missing"))
+    db.session.rollback()
+    db.session.execute(db.text("SELECT 1"))
+
+    assert request_timings.statements["SELECT * FROM missing"] == 1
+    assert request_timings.statements["SELECT 1"] == 1
+    assert "query_start" not in info
+
+
+def test_server_timing_header(app, client, headers):
+    app.config["SERVER_TIMING"] = True
+
+    timing = client.get("/v1/things", headers=headers).headers["Server-Timing"]
+
+    assert timing.startswith("sql;dur=")
+    assert "total;dur=" in timing
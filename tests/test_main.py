@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from app import hasher
+from app.export import EXPORT_TYPES
+
+
+@pytest.fixture
+def config(config):
+    return {**config, "METRICS_TOKEN": "scrape"}
+
+
+def test_metrics_need_the_token(client):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape"})
+
+    assert response.status_code == 200
+    assert b"bcrypt_duration_seconds" in response.data
+    assert b'http_requests_in_flight{class="read"}' in response.data
+
+
+@pytest.mark.parametrize("email_address", ["user@example.com", "nobody@example.com"])
+def test_password_is_hashed_for_unknown_addresses(client, user, monkeypatch, email_address):
+    checked = []
+    monkeypatch.setattr(hasher, "check", lambda password, hashed: checked.append(hashed) or False)
+
+    response = client.get("/v1/auth/token", auth=(email_address, "wrong"), headers={"Accept": "application/json"})
+
+    assert response.status_code == 401
+    assert len(checked) == 1
+
+
+def test_openapi_offers_the_export_types_served(client):
+    spec = json.loads(client.get("/openapi").data)
+
+    for path in ("/things/export", "/users/export"):
+        assert tuple(spec["paths"][path]["get"]["responses"]["200"]["content"]) == EXPORT_TYPES
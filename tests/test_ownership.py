@@ -0,0 +1,50 @@
+import uuid
+
+import pytest
+
+from app import db
+from app.models import Thing, User
+
+PEAR = {"name": "Pear", "colour": "green", "quantity": 1}
+
+
+@pytest.fixture
+def other_headers(app):
+    other = User("other@example.com", "CorrectHorseBatteryStaple")
+    db.session.add(other)
+    db.session.commit()
+    return {"Authorization": f"Bearer {other.generate_token()}", "Accept": "application/json"}
+
+
+def test_owner_can_update_their_thing(client, headers, make_things):
+    (apple,) = make_things("Apple")
+
+    response = client.put(f"/v1/things/{apple.id}", json=PEAR, headers=headers)
+
+    assert response.status_code == 200
+    assert db.session.get(Thing, apple.id).name == "Pear"
+
+
+def test_owner_can_delete_their_thing(client, headers, make_things):
+    (apple,) = make_things("Apple")
+
+    assert client.delete(f"/v1/things/{apple.id}", headers=headers).status_code == 204
+    assert db.session.get(Thing, apple.id) is None
+
+
+@pytest.mark.parametrize("method", ["put", "delete"])
+def test_other_users_are_forbidden(client, other_headers, make_things, method):
+    (apple,) = make_things("Apple")
+
+    response = getattr(client, method)(f"/v1/things/{apple.id}", json=PEAR, headers=other_headers)
+
+    assert response.status_code == 403
+    db.session.expire_all()
+    assert db.session.get(Thing, apple.id).name == "Apple"
+
+
+@pytest.mark.parametrize("method", ["put", "delete"])
+def test_missing_things_are_not_found(client, headers, method):
+    response = getattr(client, method)(f"/v1/things/{uuid.uuid4()}", json=PEAR, headers=headers)
+
+    assert response.status_code == 404
@@ -0,0 +1,72 @@
+import base64
+import json
+
+import pytest
+
+from app.pagination import encode_cursor
+
+
+def raw_cursor(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode("UTF-8")).decode("ascii").rstrip("=")
+
+
+def test_pages_follow_on_from_the_cursor(client, headers, make_things):
+    make_things("A", "B", "C")
+
+    first = client.get("/v1/things?limit=2", headers=headers)
+    second = client.get(f"/v1/things?limit=2&cursor={first.headers['X-Next-Cursor']}", headers=headers)
+
+    assert [thing["name"] for thing in first.json] == ["A", "B"]
+    assert [thing["name"] for thing in second.json] == ["C"]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_pages_sorted_by_time_follow_on_from_the_cursor(client, headers, make_things):
+    things = make_things("A", "B", "C")
+
+    first = client.get("/v1/things?limit=2&sort=created_at", headers=headers)
+    second = client.get(f"/v1/things?limit=2&sort=created_at&cursor={first.headers['X-Next-Cursor']}", headers=headers)
+
+    assert len(first.json) + len(second.json) == len(things)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        raw_cursor(["A"]),
+        raw_cursor(["A", "not-a-uuid"]),
+        raw_cursor(["A", 1]),
+        raw_cursor(["A", ["d9ecd6ee-3ab8-473b-9585-bc653024bed9"]]),
+        raw_cursor([["A"], "d9ecd6ee-3ab8-473b-9585-bc653024bed9"]),
+        raw_cursor([{"A": 1}, "d9ecd6ee-3ab8-473b-9585-bc653024bed9"]),
+        raw_cursor({"value": "A", "id": "d9ecd6ee-3ab8-473b-9585-bc653024bed9"}),
+    ],
+)
+def test_invalid_cursors_are_bad_requests(client, headers, cursor):
+    response = client.get(f"/v1/things?cursor={cursor}", headers=headers)
+
+    assert response.status_code == 400
+
+
+def test_invalid_time_in_cursor_is_a_bad_request(client, headers):
+    cursor = encode_cursor("yesterday", "d9ecd6ee-3ab8-473b-9585-bc653024bed9")
+
+    assert client.get(f"/v1/things?sort=created_at&cursor={cursor}", headers=headers).status_code == 400
+
+
+@pytest.mark.parametrize(
+    "sort, value",
+    [("name", 5), ("name", 1.5), ("name", True), ("name", None), ("created_at", 5), ("created_at", None)],
+)
+def test_cursor_value_of_the_wrong_type_is_a_bad_request(client, headers, sort, value):
+    cursor = raw_cursor([value, "d9ecd6ee-3ab8-473b-9585-bc653024bed9"])
+
+    assert client.get(f"/v1/things?sort={sort}&cursor={cursor}", headers=headers).status_code == 400
+
+
+def test_null_cursor_value_is_allowed_for_nullable_columns(client, headers, make_things):
+    make_things("Apple")
+    cursor = raw_cursor([None, "00000000-0000-0000-0000-000000000000"])
+
+    assert client.get(f"/v1/things?sort=updated_at&cursor={cursor}", headers=headers).status_code == 200
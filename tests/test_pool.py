@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import db, export
+from app.pool import set_statement_timeout
+from app.thing import routes
+
+
+class RecordingConnection(object):
+    def __init__(self, dialect):
+        self.dialect = SimpleNamespace(name=dialect)
+        self.executed = []
+
+    def execute(self, statement, parameters=None):
+        self.executed.append((str(statement), parameters))
+
+
+@pytest.fixture
+def timeouts(monkeypatch):
+    """Record the statement timeouts set by exports and batches."""
+    timeouts = []
+    for module in (export, routes):
+        monkeypatch.setattr(module, "set_statement_timeout", lambda connection, timeout: timeouts.append(timeout))
+    return timeouts
+
+
+def test_statement_timeout_is_set_for_the_transaction_on_postgresql():
+    connection = RecordingConnection("postgresql")
+
+    set_statement_timeout(connection, 0)
+
+    assert connection.executed == [("SELECT set_config('statement_timeout', :timeout, true)", {"timeout": "0"})]
+
+
+def test_statement_timeout_is_ignored_elsewhere(app):
+    with db.engine.connect() as connection:
+        set_statement_timeout(connection, 1000)
+
+
+def test_exports_use_their_own_statement_timeout(app, client, headers, make_things, timeouts):
+    app.config["EXPORT_STATEMENT_TIMEOUT"] = 0
+    make_things("Apple")
+
+    assert client.get("/v1/things/export", headers=headers).status_code == 200
+    assert timeouts == [0]
+
+
+def test_batches_use_their_own_statement_timeout_for_each_chunk(app, client, headers, timeouts):
+    app.config.update(BATCH_CHUNK_SIZE=1, BATCH_STATEMENT_TIMEOUT=60000)
+    operations = [{"op": "create", "data": {"name": "Apple", "colour": "red", "quantity": 1}}] * 2
+
+    assert client.post("/v1/things/batch", json=operations, headers=headers).status_code == 200
+    assert timeouts == [60000, 60000]
@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app import db, replicas
+from app.models import User
+from app.pool import InstrumentedPool
+
+
+@pytest.fixture
+def config(config, tmp_path):
+    return {
+        **config,
+        "SQLALCHEMY_REPLICA_URIS": [f"sqlite:///{tmp_path / 'replica_0.db'}", f"sqlite:///{tmp_path / 'replica_1.db'}"],
+    }
+
+
+def engine(key):
+    return db.engines[key]
+
+
+def test_get_reads_from_a_replica(app):
+    with app.test_request_context(method="GET"):
+        assert db.session.get_bind() in (engine("replica_0"), engine("replica_1"))
+
+
+def test_reads_in_a_request_use_the_same_replica(app):
+    with app.test_request_context(method="GET"):
+        first = db.session.get_bind()
+        assert all(db.session.get_bind() is first for _ in range(4))
+
+
+@pytest.mark.parametrize("method", ["POST", "PUT", "DELETE"])
+def test_other_methods_read_from_the_primary(app, method):
+    with app.test_request_context(method=method):
+        assert db.session.get_bind() is db.engine
+
+
+def test_reads_after_a_write_stay_on_the_primary(app):
+    with app.test_request_context(method="GET"):
+        db.session.add(User("user@example.com", "password"))
+        db.session.flush()
+
+        assert db.session.get_bind() is db.engine
+        assert User.query.filter_by(email_address="user@example.com").one()
+
+
+def test_unhealthy_replica_is_skipped(app, monkeypatch):
+    monkeypatch.setattr(replicas, "check", lambda key: key == "replica_1")
+
+    for _ in range(4):
+        with app.test_request_context(method="GET"):
+            assert db.session.get_bind() is engine("replica_1")
+        db.session.remove()
+
+
+def test_primary_is_used_when_no_replica_is_healthy(app, monkeypatch):
+    monkeypatch.setattr(replicas, "check", lambda key: False)
+
+    with app.test_request_context(method="GET"):
+        assert db.session.get_bind() is db.engine
+
+
+def test_health_is_checked_once_per_interval(app, monkeypatch):
+    checked = []
+    monkeypatch.setattr(replicas, "check", lambda key: checked.append(key) or True)
+
+    for _ in range(4):
+        assert replicas.is_healthy("replica_0")
+
+    assert checked == ["replica_0"]
+
+
+def test_unreachable_replica_is_unhealthy(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(db.engines, "replica_0", create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"))
+
+    assert not replicas.check("replica_0")
+    assert replicas.check("replica_1")
+
+
+def test_replicas_have_the_primary_pool_options(app):
+    assert isinstance(engine("replica_0").pool, InstrumentedPool)
+    assert engine("replica_0").pool.size() == app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"]
@@ -0,0 +1,51 @@
+import pytest
+
+from app.models import Thing
+from app.search import contains, matches, search
+
+
+def names(query):
+    return sorted(thing.name for thing in query)
+
+
+def test_contains_ignores_case(make_things):
+    make_things("Apple", "Pineapple", "Banana")
+
+    assert names(Thing.query.filter(contains(Thing.name, "APPLE"))) == ["Apple", "Pineapple"]
+
+
+@pytest.mark.parametrize("text, expected", [("0%", ["100%"]), ("a_b", ["A_B"]), ("\\", ["A\\B"])])
+def test_contains_escapes_wildcards(make_things, text, expected):
+    make_things("100%", "1000", "A_b", "Axb", "A\\b")
+
+    assert names(Thing.query.filter(contains(Thing.name, text))) == expected
+
+
+def test_matches_falls_back_to_contains_on_sqlite(make_things):
+    make_things("Red Apple", "Green Apple", "Pear")
+
+    assert names(Thing.query.filter(matches(Thing.name, "apple"))) == ["Green Apple", "Red Apple"]
+
+
+@pytest.mark.parametrize("mode", ["trigram", "fulltext"])
+def test_search_uses_search_mode(app, make_things, mode):
+    app.config["SEARCH_MODE"] = mode
+    make_things("Apple", "Pear")
+
+    assert names(Thing.query.filter(search(Thing.name, "pp"))) == ["Apple"]
+
+
+def test_list_things_filters_by_name(client, headers, make_things):
+    make_things("Apple", "Pineapple", "Pear")
+
+    response = client.get("/v1/things?name=apple", headers=headers)
+
+    assert response.status_code == 200
+    assert sorted(thing["name"] for thing in response.json) == ["Apple", "Pineapple"]
+
+
+def test_list_users_filters_by_email_address(client, headers, user):
+    response = client.get("/v1/users?email_address=USER@", headers=headers)
+
+    assert response.status_code == 200
+    assert [found["email_address"] for found in response.json] == [user.email_address]
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app import db, serialiser
+from app.models import User
+from app.serialisation import backends, parse_datetime
+
+AWARE = datetime(2026, 10, 18, 12, 30, 0, 5, tzinfo=timezone.utc)
+
+
+@pytest.fixture(params=sorted(backends))
+def backend(request):
+    serialiser.use(request.param)
+    yield request.param
+    serialiser.use("auto")
+
+
+def test_backends_write_the_same_values(backend):
+    value = {"id": "d9ecd6ee-3ab8-473b-9585-bc653024bed9", "naive": AWARE.replace(tzinfo=None), "n": [1, 2.5, None]}
+
+    assert serialiser.loads(serialiser.dumps(value)) == serialiser.loads(backends["json"][0](value))
+
+
+def test_backends_write_datetimes_that_parse_back(backend):
+    written = serialiser.loads(serialiser.dumps({"aware": AWARE, "naive": AWARE.replace(tzinfo=None)}))
+
+    assert parse_datetime(written["aware"]) == AWARE
+    assert parse_datetime(written["naive"]) == AWARE.replace(tzinfo=None)
+
+
+@pytest.mark.parametrize("value", ["2026-10-18T12:30:00Z", "2026-10-18T12:30:00+00:00"])
+def test_parse_datetime_reads_either_utc_offset(value):
+    assert parse_datetime(value) == datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+
+
+def test_cached_user_reads_back_with_every_backend(app, user, backend):
+    user.updated_at = AWARE
+    data = user.to_cache()
+    db.session.expunge(user)
+
+    cached = User.from_cache(data)
+
+    assert (cached.id, cached.email_address, cached.updated_at) == (user.id, user.email_address, AWARE)
@@ -0,0 +1,67 @@
+import pytest
+
+from app import db
+from app.models import Thing, ThingDailyCount, User
+
+
+@pytest.fixture
+def other_user(app):
+    user = User("other@example.com", "CorrectHorseBatteryStaple")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def stats(client, headers, query_string):
+    response = client.get(f"/v1/things/stats?{query_string}", headers=headers)
+    assert response.status_code == 200
+    return response.json
+
+
+def test_counts_every_users_things(client, headers, user, other_user, make_things):
+    make_things("Apple", "Pear")
+    db.session.add(Thing("Plum", "red", other_user.id))
+    db.session.commit()
+
+    body = stats(client, headers, "group_by=user_id")
+
+    assert body["total"] == 3
+    assert sorted((group["value"], group["count"]) for group in body["groups"]) == sorted(
+        [(user.id, 2), (other_user.id, 1)]
+    )
+
+
+def test_counts_by_colour_with_filters(client, headers, make_things):
+    make_things("Apple", "Pear")
+    make_things("Grape", "Kiwi", colour="green")
+
+    body = stats(client, headers, "group_by=colour&name=ap")
+
+    assert body == {
+        "group_by": "colour",
+        "total": 2,
+        "groups": [{"value": "green", "count": 1}, {"value": "red", "count": 1}],
+    }
+
+
+def test_counts_by_creation_day(client, headers, make_things):
+    things = make_things("Apple", "Pear")
+
+    body = stats(client, headers, "group_by=day")
+
+    assert body["groups"] == [{"value": things[0].created_at.date().isoformat(), "count": 2}]
+
+
+def test_unknown_group_is_a_bad_request(client, headers):
+    assert client.get("/v1/things/stats?group_by=name", headers=headers).status_code == 400
+
+
+def test_summary_isnt_used_when_filtering_by_update_time(app, client, headers, make_things):
+    app.config["STATS_SUMMARY"] = True
+    make_things("Apple", "Pear")
+    db.session.execute(db.delete(ThingDailyCount))
+    db.session.commit()
+
+    assert stats(client, headers, "updated_since=2000-01-01T00:00:00Z")["total"] == 2
+    assert stats(client, headers, "updated_since=2999-01-01T00:00:00Z")["total"] == 0
+    assert stats(client, headers, "colour=red")["total"] == 0
@@ -0,0 +1,71 @@
+import pytest
+
+from app import db, hasher
+from app.models import User
+from tests.conftest import PASSWORD
+
+JSON = {"Accept": "application/json", "Content-Type": "application/json"}
+
+
+@pytest.fixture
+def other_user(app):
+    other = User("other@example.com", PASSWORD)
+    db.session.add(other)
+    db.session.commit()
+    return other
+
+
+def sign_up(client, email_address):
+    return client.post("/v1/users", json={"email_address": email_address, "password": PASSWORD}, headers=JSON)
+
+
+def update(client, headers, user, email_address, password=PASSWORD):
+    return client.put(
+        f"/v1/users/{user.id}", json={"email_address": email_address, "password": password}, headers=headers
+    )
+
+
+def test_sign_up_stores_the_address_in_lower_case(client):
+    response = sign_up(client, "New.User@Example.com")
+
+    assert response.status_code == 201
+    assert response.json["email_address"] == "new.user@example.com"
+
+
+@pytest.mark.parametrize("email_address", ["user@example.com", "USER@example.com", " User@Example.COM "])
+def test_sign_up_with_a_taken_address_is_a_bad_request(client, user, monkeypatch, email_address):
+    hashed = []
+    monkeypatch.setattr(hasher, "hash", lambda password: hashed.append(password))
+
+    assert sign_up(client, email_address).status_code == 400
+    assert User.query.count() == 1
+    assert hashed == []
+
+
+def test_create_returns_none_for_a_taken_address(app, user):
+    assert User.create("User@Example.com", PASSWORD) is None
+
+
+@pytest.mark.parametrize("email_address", ["other@example.com", "Other@Example.com"])
+def test_updating_to_another_users_address_is_a_bad_request(client, headers, user, other_user, email_address):
+    password = user.password
+
+    assert update(client, headers, user, email_address, "NewCorrectHorseBatteryStaple").status_code == 400
+
+    db.session.expire_all()
+    assert db.session.get(User, user.id).email_address == "user@example.com"
+    assert db.session.get(User, user.id).password == password
+
+
+def test_updating_to_the_same_address_in_another_case_is_allowed(client, headers, user):
+    response = update(client, headers, user, "USER@example.com")
+
+    assert response.status_code == 200
+    assert response.json["email_address"] == "user@example.com"
+
+
+def test_updating_to_a_free_address(client, headers, user, other_user):
+    response = update(client, headers, user, "New@Example.com")
+
+    assert response.status_code == 200
+    assert response.json["email_address"] == "new@example.com"